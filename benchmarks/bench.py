@@ -0,0 +1,235 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import numpy as np
+
+# exercise1 modules import each other as top-level modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "exercise1"))
+
+from benchmarks.generators import make_list, make_array, make_signal_array, make_dependency_json  # noqa: E402
+from detect_duplicates import detect_duplicates, detect_duplicates_unsorted, detect_duplicates_sorted  # noqa: E402
+from detect_duplicates import detect_duplicates_hashed, detect_duplicates_approximate, detect_duplicates_parallel, DuplicateDetector  # noqa: E402
+from array_duplicates import detect_duplicates_array, detect_duplicates_array_approximate  # noqa: E402
+from utils.functions import is_sorted  # noqa: E402
+from exercise2.dependency_graph import build_graph  # noqa: E402
+
+
+# Registry of the benchmarks: name -> (setup, largest size)
+# setup(size, duplicate_ratio) prepares the input (not timed) and returns the function to time
+BENCHMARKS = {}
+
+
+def benchmark(name, max_size=None):
+    def register(setup):
+        BENCHMARKS[name] = (setup, max_size)
+        return setup
+    return register
+
+
+@benchmark("detect_duplicates/unsorted_int")
+def _detect_duplicates_unsorted_int(size, ratio):
+    input_list = make_list(size, ratio)
+    return lambda: detect_duplicates(input_list)
+
+
+@benchmark("detect_duplicates/sorted_int")
+def _detect_duplicates_sorted_int(size, ratio):
+    input_list = make_list(size, ratio, sorted_order=True)
+    return lambda: detect_duplicates(input_list)
+
+
+@benchmark("detect_duplicates/mixed_types")
+def _detect_duplicates_mixed(size, ratio):
+    input_list = make_list(size, ratio, types=("int", "float", "str", "bool", "list", "date"))
+    return lambda: detect_duplicates(input_list)
+
+
+@benchmark("engine/unsorted", max_size=10**4)  # O(n^3) reference implementation
+def _engine_unsorted(size, ratio):
+    input_list = make_list(size, ratio)
+    return lambda: detect_duplicates_unsorted(input_list)
+
+
+@benchmark("engine/sorted")
+def _engine_sorted(size, ratio):
+    input_list = make_list(size, ratio, sorted_order=True)
+    return lambda: detect_duplicates_sorted(input_list)
+
+
+@benchmark("engine/hashed")
+def _engine_hashed(size, ratio):
+    input_list = make_list(size, ratio)
+    return lambda: detect_duplicates_hashed(input_list)
+
+
+@benchmark("engine/approximate")
+def _engine_approximate(size, ratio):
+    input_list = make_list(size, ratio)
+    return lambda: detect_duplicates_approximate(input_list)
+
+
+@benchmark("engine/parallel")
+def _engine_parallel(size, ratio):
+    input_list = make_list(size, ratio)
+    return lambda: detect_duplicates_parallel(input_list, workers=2)
+
+
+@benchmark("engine/streaming")
+def _engine_streaming(size, ratio):
+    input_list = make_list(size, ratio)
+    return lambda: DuplicateDetector().update(input_list)
+
+
+@benchmark("is_sorted/sorted")  # Worst case, the whole list is scanned
+def _is_sorted_sorted(size, ratio):
+    input_list = make_list(size, ratio, sorted_order=True)
+    return lambda: is_sorted(input_list)
+
+
+@benchmark("array/unsorted")
+def _array_unsorted(size, ratio):
+    input_array = make_array(size, ratio)
+    return lambda: detect_duplicates_array(input_array)
+
+
+@benchmark("array/sorted")
+def _array_sorted(size, ratio):
+    input_array = make_array(size, ratio, sorted_order=True)
+    return lambda: detect_duplicates_array(input_array)
+
+
+@benchmark("array/approximate")
+def _array_approximate(size, ratio):
+    input_array = make_array(size, ratio)
+    return lambda: detect_duplicates_array_approximate(input_array)
+
+
+@benchmark("signal/detect_duplicates")
+def _signal_detect_duplicates(size, ratio):
+    from signals import Signal
+    signal = Signal("ADC", make_signal_array(size, ratio), axis="both")
+
+    def run():
+        signal._invalidate()  # Cached verdicts would skip the scan
+        return signal._detect_duplicates()
+    return run
+
+
+@benchmark("signal/intersections")
+def _signal_intersections(size, ratio):
+    from signals import Signal
+    first = Signal("BPM", make_signal_array(size, 0, seed=1))
+    second = Signal("BPM", make_signal_array(size, 0, seed=2))
+
+    def run():
+        first._invalidate()
+        second._invalidate()
+        return first.signal_intersections(second, "y")
+    return run
+
+
+@benchmark("signal/remove_duplicates")
+def _signal_remove_duplicates(size, ratio):
+    from signals import Signal
+    data = make_signal_array(size, ratio)
+    return lambda: Signal("ADC", data).remove_duplicates(axis="y")
+
+
+@benchmark("graph/build_graph")
+def _build_graph(size, ratio):
+    path = _dependency_file(size)
+    return lambda: build_graph(path)
+
+
+@benchmark("graph/display_graph", max_size=10**3)  # Output grows with the number of paths
+def _display_graph(size, ratio):
+    graph = build_graph(_dependency_file(size, max_deps=2))
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            for pkg in list(graph.graph):
+                graph.display_graph(pkg)
+    return run
+
+
+@benchmark("graph/render")
+def _render(size, ratio):
+    graph = build_graph(_dependency_file(size, max_deps=2))
+    return lambda: graph.render(file=io.StringIO(), collapse=True)
+
+
+def _dependency_file(packages, max_deps=3):
+    path = os.path.join(tempfile.gettempdir(), f"bench_deps_{packages}_{max_deps}.json")
+    if not os.path.exists(path):
+        make_dependency_json(path, packages, max_deps)
+    return path
+
+
+def run_benchmarks(sizes, duplicate_ratio=0.1, repeat=3, pattern=None):
+    # Returns the best time (seconds) of every benchmark and size, keyed by "name/size"
+    results = {}
+    for name, (setup, max_size) in BENCHMARKS.items():
+        if pattern and pattern not in name:
+            continue
+        for size in sizes:
+            if max_size is not None and size > max_size:
+                continue
+            function = setup(size, duplicate_ratio)
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                function()
+                timings.append(time.perf_counter() - start)
+            results[f"{name}/{size}"] = min(timings)
+    return results
+
+
+def compare(results, baseline, threshold=0.1):
+    # Returns the regressions: benchmarks that are slower than the baseline by more than threshold (0.1 = 10%)
+    regressions = {}
+    for key, seconds in results.items():
+        reference = baseline.get(key)
+        if reference and seconds > reference * (1 + threshold):
+            regressions[key] = (reference, seconds)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of the duplicate detection and dependency graph hot paths.")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1e3, 1e4, 1e5], help="input sizes, e.g. 1e3 1e5 1e7")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.1)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark, the best time is kept")
+    parser.add_argument("--filter", default=None, help="only run the benchmarks whose name contains this text")
+    parser.add_argument("--output", default=None, help="JSON file for the results")
+    parser.add_argument("--baseline", default=None, help="JSON file of stored results to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed slowdown against the baseline (0.1 = 10%%)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks([int(size) for size in args.sizes], args.duplicate_ratio, args.repeat, args.filter)
+    for key, seconds in results.items():
+        print(f"{key:45s} {seconds * 1e3:12.3f} ms")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "machine": platform.machine(),
+                "results": results,
+            }, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for key, (reference, seconds) in regressions.items():
+            print(f"Regression {key}: {reference * 1e3:.3f} ms -> {seconds * 1e3:.3f} ms")
+        if regressions:
+            return 1
+    return 0
@@ -0,0 +1,69 @@
+import json
+import random
+import string
+import numpy as np
+
+
+# Generators of synthetic inputs for the benchmarks. The same seed gives the same input
+
+
+def make_list(size, duplicate_ratio=0.1, types=("int",), sorted_order=False, seed=0):
+    # List of size elements, where about duplicate_ratio of the elements repeat an earlier element
+    # types: any of "int", "float", "str", "bool", "list", "date"
+    rng = random.Random(seed)
+    distinct = max(1, int(size * (1 - duplicate_ratio)))
+    pool = [_make_element(rng, types[i % len(types)], i) for i in range(distinct)]
+    elements = pool + [rng.choice(pool) for _ in range(size - distinct)]
+    if sorted_order and len(types) == 1 and types[0] != "date":
+        elements.sort()
+    else:
+        rng.shuffle(elements)
+    return elements
+
+
+def _make_element(rng, element_type, i):
+    # Distinct values for distinct i
+    if element_type == "int":
+        return i
+    if element_type == "float":
+        return i + rng.random() / 2
+    if element_type == "str":
+        return "".join(rng.choices(string.ascii_lowercase, k=6)) + str(i)
+    if element_type == "bool":
+        return bool(i % 2)
+    if element_type == "list":
+        return [i, i + 1]
+    if element_type == "date":
+        from utils.classes import Date
+        return Date(i % 28 + 1, i // 28 % 12 + 1, i // 336)
+    raise ValueError(f"Unsupported type: {element_type}")
+
+
+def make_array(size, duplicate_ratio=0.1, sorted_order=False, seed=0):
+    # float64 array of size samples, where about duplicate_ratio of the samples repeat an earlier sample
+    rng = np.random.default_rng(seed)
+    distinct = max(1, int(size * (1 - duplicate_ratio)))
+    values = np.concatenate((rng.permutation(distinct), rng.integers(0, distinct, size - distinct))) * 1e-3
+    if sorted_order:
+        return np.sort(values)
+    return rng.permutation(values)
+
+
+def make_signal_array(size, duplicate_ratio=0.1, seed=0):
+    # (2, size) signal: sorted time axis and voltages
+    return np.array((np.arange(size) * 1e-3, make_array(size, duplicate_ratio, seed=seed)))
+
+
+def make_dependency_json(path, packages, max_deps=3, seed=0):
+    # Writes a dependency JSON file {package: [dependencies]}. Packages only depend on packages with a higher number,
+    # so the graph has no cycles, and most packages are shared by several dependents (diamonds)
+    rng = random.Random(seed)
+    names = [f"pkg{i}" for i in range(packages)]
+    graph = {}
+    for i, name in enumerate(names):
+        later = packages - i - 1
+        count = min(later, rng.randint(0, max_deps))
+        graph[name] = [names[i + 1 + offset] for offset in rng.sample(range(later), count)] if count else []
+    with open(path, "w") as file:
+        json.dump(graph, file)
+    return path
@@ -0,0 +1,36 @@
+import json
+import numpy as np
+from benchmarks.bench import BENCHMARKS, run_benchmarks, compare, main
+from benchmarks.generators import make_list, make_array, make_dependency_json
+from exercise2.dependency_graph import build_graph
+
+
+def test_generators(tmp_path):
+    input_list = make_list(1000, duplicate_ratio=0.25, types=("int", "str"))
+    assert len(input_list) == 1000 and len(set(input_list)) == 750
+    assert make_list(100, sorted_order=True) == sorted(make_list(100))
+    input_array = make_array(1000, duplicate_ratio=0.5, seed=3)
+    assert len(np.unique(input_array)) <= 500 and np.array_equal(input_array, make_array(1000, 0.5, seed=3))
+
+    graph = build_graph(make_dependency_json(tmp_path / "deps.json", 50))
+    assert len(graph.graph) == 50
+    assert all(int(dep[3:]) > int(pkg[3:]) for pkg, deps in graph.graph.items() for dep in deps)  # No cycles
+
+
+def test_run_benchmarks():
+    results = run_benchmarks([100, 10**9], repeat=1, pattern="engine/unsorted")
+    assert list(results) == ["engine/unsorted/100"]  # Sizes above the limit of the benchmark are skipped
+    assert all(name.count("/") == 1 for name in BENCHMARKS)
+
+
+def test_compare(tmp_path):
+    baseline = {"a/100": 1.0, "b/100": 1.0}
+    assert compare({"a/100": 1.05, "b/100": 1.5, "c/100": 9.0}, baseline, threshold=0.1) == {"b/100": (1.0, 1.5)}
+
+    # Regressions against a stored baseline fail the run
+    output = tmp_path / "results.json"
+    assert main(["--sizes", "100", "--repeat", "1", "--filter", "engine/hashed", "--output", str(output)]) == 0
+    stored = json.loads(output.read_text())
+    stored["results"] = {key: seconds / 100 for key, seconds in stored["results"].items()}
+    output.write_text(json.dumps(stored))
+    assert main(["--sizes", "100", "--repeat", "1", "--filter", "engine/hashed", "--baseline", str(output)]) == 1
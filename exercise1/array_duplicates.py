@@ -0,0 +1,430 @@
+import os
+import tempfile
+import numpy as np
+from utils.bloom import bloom_size
+
+# Constants of the splitmix64 finalizer, see utils/bloom.py
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+
+def is_sorted_array(input_array=None):
+    # Function that returns True if the array is sorted (ascending or descending order)
+    # O(n) time complexity, vectorized
+    if len(input_array) < 2:
+        return True
+    return bool(np.all(input_array[:-1] <= input_array[1:]) or np.all(input_array[:-1] >= input_array[1:]))
+
+
+def detect_duplicates_sorted_array(input_array=None):
+    # Time complexity O(n), equal values of a sorted array are adjacent
+    repeated = input_array[1:][input_array[1:] == input_array[:-1]]
+    if len(repeated) == 0:
+        return repeated
+
+    # Keep each duplicate once, i.e. the first element of every run of equal values
+    first_of_run = np.ones(len(repeated), dtype=bool)
+    first_of_run[1:] = repeated[1:] != repeated[:-1]
+    return repeated[first_of_run]
+
+
+# sorted_hint: True or False when the caller already knows if the array is sorted, skips the is_sorted_array() check
+def detect_duplicates_array(input_array=None, sorted_hint=None):
+    # Duplicate detection for homogeneous numeric arrays, without boxing the elements into Python objects
+    # Time complexity O(n log n), where n is the number of elements in the array. O(n) for sorted arrays
+    # Returns the duplicate values as an array, in the order of their first occurrence
+    # NaN is never equal to NaN, as in the list engines: NaN values are never duplicates (same rule in every array engine)
+    if not isinstance(input_array, np.ndarray):
+        raise TypeError("Input must be a numpy ndarray.")
+    if input_array.ndim != 1:
+        raise ValueError("Input must be a one-dimensional array.")
+
+    if sorted_hint is None:
+        sorted_hint = is_sorted_array(input_array)
+
+    if sorted_hint:
+        return detect_duplicates_sorted_array(input_array)
+
+    values, first_index, counts = np.unique(input_array, return_index=True, return_counts=True, equal_nan=False)
+    repeated = counts > 1
+
+    # np.unique sorts by value, restore the order of the first occurrences
+    order = np.argsort(first_index[repeated], kind="stable")
+    return values[repeated][order]
+
+
+# Function that returns the values common to two arrays, in the order of their first occurrence in the first array,
+# and the indices of their first occurrences in both arrays. Sorted merge, time complexity O(n log n)
+# assume_unique: both arrays are known to be free of duplicates, skips the unique-values step
+def intersect_arrays(first_array=None, second_array=None, assume_unique=False):
+    values, first_indices, second_indices = np.intersect1d(first_array, second_array, assume_unique=assume_unique, return_indices=True)
+    order = np.argsort(first_indices, kind="stable")
+    return values[order], first_indices[order], second_indices[order]
+
+
+# Function that groups near-equal values: |a - b| <= atol + rtol * max(|a|, |b|)
+# Sort-and-sweep, time complexity O(n log n). Neighbours in sorted order within tolerance join the same cluster,
+# so a cluster may chain values that are further apart than the tolerance
+# Returns the indices of every cluster with at least two values, ordered by their first occurrence
+def cluster_near_duplicates(input_array=None, atol=0.0, rtol=0.0):
+    if not isinstance(input_array, np.ndarray):
+        raise TypeError("Input must be a numpy ndarray.")
+    if input_array.ndim != 1:
+        raise ValueError("Input must be a one-dimensional array.")
+    if atol < 0 or rtol < 0:
+        raise ValueError("Tolerances must be non-negative.")
+    if len(input_array) < 2:
+        return []
+
+    order = np.argsort(input_array, kind="stable")
+    sorted_values = input_array[order]
+    tolerance = atol + rtol * np.maximum(np.abs(sorted_values[:-1]), np.abs(sorted_values[1:]))
+    linked = np.diff(sorted_values) <= tolerance
+
+    # A new cluster starts at every sorted value that is not linked to the previous one
+    boundaries = np.concatenate(([0], np.flatnonzero(~linked) + 1, [len(sorted_values)]))
+    starts, ends = boundaries[:-1], boundaries[1:]
+    repeated = ends - starts > 1
+
+    clusters = [np.sort(order[start:end]) for start, end in zip(starts[repeated], ends[repeated])]
+    clusters.sort(key=lambda cluster: cluster[0])
+    return clusters
+
+
+# Function that matches every value of the first array with the nearest value of the second array within tolerance
+# |a - b| <= atol + rtol * max(|a|, |b|). Binary search over the sorted second array, time complexity O(n log n)
+# Returns the indices of the matched pairs in the first and in the second array, ordered by the first array
+def intersect_arrays_tolerance(first_array=None, second_array=None, atol=0.0, rtol=0.0):
+    if atol < 0 or rtol < 0:
+        raise ValueError("Tolerances must be non-negative.")
+    if len(first_array) == 0 or len(second_array) == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+    order = np.argsort(second_array, kind="stable")
+    sorted_values = second_array[order]
+    right = np.clip(np.searchsorted(sorted_values, first_array), 0, len(sorted_values) - 1)
+    left = np.clip(right - 1, 0, len(sorted_values) - 1)
+
+    # Nearest neighbour between the values around the insertion point. Ties go to the larger value (exact matches)
+    right_distance = np.abs(sorted_values[right] - first_array)
+    left_distance = np.abs(sorted_values[left] - first_array)
+    nearest = np.where(right_distance <= left_distance, right, left)
+    distance = np.minimum(right_distance, left_distance)
+
+    tolerance = atol + rtol * np.maximum(np.abs(first_array), np.abs(sorted_values[nearest]))
+    matched = np.flatnonzero(distance <= tolerance)
+    return matched, order[nearest[matched]]
+
+
+# Function that marks the first occurrence of every distinct value (or tuple of values, for several arrays of equal length)
+# Stable sort by value, time complexity O(n log n). NaN is never equal to NaN, as in the detection engines: every NaN is kept
+def first_occurrence_mask(arrays=None):
+    size = len(arrays[0])
+    mask = np.zeros(size, dtype=bool)
+    if size == 0:
+        return mask
+
+    # np.lexsort is stable, so equal values (tuples) keep their index order and the first of each run is the first occurrence
+    order = np.lexsort(arrays[::-1])
+    new_value = np.zeros(size, dtype=bool)
+    new_value[0] = True
+    for array in arrays:
+        sorted_values = array[order]
+        new_value[1:] |= sorted_values[1:] != sorted_values[:-1]
+    mask[order[new_value]] = True
+    return mask
+
+
+def hash_array(input_array=None):
+    # Function that returns 64-bit hashes of the values of a numeric array. Equal values get equal hashes
+    # Values are compared as float64, so integers above 2**53 may share a hash (never the opposite)
+    if input_array.dtype.kind not in "biuf":
+        raise TypeError("Only numeric arrays are supported.")
+    values = input_array.astype(np.float64)
+    values += 0.0  # -0.0 becomes 0.0, they are equal values with different bits
+
+    hashes = values.view(np.uint64)
+    hashes ^= hashes >> np.uint64(30)
+    hashes *= _MIX1
+    hashes ^= hashes >> np.uint64(27)
+    hashes *= _MIX2
+    hashes ^= hashes >> np.uint64(31)
+    return hashes
+
+
+# Memory-bounded version of detect_duplicates_array(). The array is scanned in chunks through a Bloom filter,
+# the values that were possibly seen before (candidates) are then confirmed exactly, so the output is identical
+# error_rate: false positive rate of the filter. max_bytes: memory budget of the filter
+# report: optional dictionary, filled with the memory used and the number of rejected candidates
+def detect_duplicates_array_approximate(input_array=None, error_rate=0.01, max_bytes=None, chunk_size=1 << 16, report=None):
+    if not isinstance(input_array, np.ndarray):
+        raise TypeError("Input must be a numpy ndarray.")
+    if input_array.ndim != 1:
+        raise ValueError("Input must be a one-dimensional array.")
+
+    num_bits, num_hashes = bloom_size(len(input_array), error_rate, max_bytes)
+    bits = np.zeros((num_bits + 7) // 8, dtype=np.uint8)
+    candidates = [input_array[:0]]
+
+    # 1st pass: probabilistic pre-filter, chunk by chunk
+    for start in range(0, len(input_array), chunk_size):
+        chunk = input_array[start:start + chunk_size]
+        hashes = hash_array(chunk)
+
+        # Double hashing, the k bit positions are derived from the two halves of one 64-bit hash
+        position = hashes & np.uint64(0xFFFFFFFF)
+        step = (hashes >> np.uint64(32)) | np.uint64(1)
+        present = np.ones(len(chunk), dtype=bool)
+        positions = []
+        for _ in range(num_hashes):
+            bit = position % np.uint64(num_bits)
+            present &= (bits[bit >> np.uint64(3)] & _bit_mask(bit)) != 0
+            positions.append(bit)
+            position += step
+
+        # Values repeated inside the chunk are candidates as well
+        _, inverse, counts = np.unique(chunk, return_inverse=True, return_counts=True, equal_nan=False)
+        present |= counts[inverse] > 1
+        candidates.append(np.unique(chunk[present]))
+
+        for bit in positions:
+            np.bitwise_or.at(bits, bit >> np.uint64(3), _bit_mask(bit))
+
+    # 2nd pass: exact confirmation over the candidates only
+    # The relative order of the elements is kept, so the first occurrences are in the same order
+    candidates = np.unique(np.concatenate(candidates))
+    is_candidate = np.isin(input_array, candidates)
+    candidate_values = input_array[is_candidate]
+    duplicates = detect_duplicates_array(candidate_values, sorted_hint=False)
+
+    if report is not None:
+        candidate_bytes = candidates.nbytes + is_candidate.nbytes + candidate_values.nbytes
+        report.update({
+            "filter_bytes": bits.nbytes,
+            "filter_hashes": num_hashes,
+            "candidate_bytes": candidate_bytes,
+            "memory_bytes": bits.nbytes + candidate_bytes,
+            "candidates": len(candidates),
+            "rejected": len(candidates) - len(duplicates),
+        })
+
+    return duplicates
+
+
+def _bit_mask(bit):
+    # Mask of a bit position inside its byte
+    return np.left_shift(np.uint8(1), (bit & np.uint64(7)).astype(np.uint8))
+
+
+def partition_duplicates(input_array=None, part=0, parts=1, chunk_size=1 << 20):
+    # Function that finds the duplicates among the values whose hash falls in one partition (hash % parts == part)
+    # Equal values always share a partition, so partitions are independent. Memory is bounded by the partition size
+    # Returns the duplicate values and the global indices of their first occurrences
+    values, indices = [input_array[:0]], [np.empty(0, dtype=np.int64)]
+    for start in range(0, len(input_array), chunk_size):
+        chunk = input_array[start:start + chunk_size]
+        selected = np.flatnonzero(hash_array(chunk) % np.uint64(parts) == np.uint64(part)) if parts > 1 else np.arange(len(chunk))
+        values.append(chunk[selected])
+        indices.append(selected + start)
+    return _first_duplicates(np.concatenate(values), np.concatenate(indices))
+
+
+def _first_duplicates(values, indices):
+    # Duplicate values of a partition and the global indices of their first occurrences
+    # Values must be in index order, so np.unique returns the first occurrence of each value
+    unique_values, first_index, counts = np.unique(values, return_index=True, return_counts=True, equal_nan=False)
+    repeated = counts > 1
+    return unique_values[repeated], indices[first_index[repeated]]
+
+
+# Multi-core version of detect_duplicates_array(). The array is copied once into shared memory (no pickled copies)
+# Phase 1: each worker process hashes one range of the array and writes the partition of its values (hash % workers)
+# Phase 2: the indices are grouped by partition, and each worker checks the values of one partition. Only the duplicates are sent back
+# Every value is hashed once, as in the serial engines
+# workers: number of processes (default: number of CPUs)
+def detect_duplicates_array_parallel(input_array=None, workers=None, chunk_size=1 << 20):
+    if not isinstance(input_array, np.ndarray):
+        raise TypeError("Input must be a numpy ndarray.")
+    if input_array.ndim != 1:
+        raise ValueError("Input must be a one-dimensional array.")
+    hash_array(input_array[:0])  # Raises TypeError for non numeric arrays
+    workers = min(workers or os.cpu_count() or 1, np.iinfo(np.uint16).max)
+    length = len(input_array)
+
+    # Loaded on first use, most callers never start a pool
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import shared_memory
+
+    blocks = []
+    try:
+        shared = _shared_copy(shared_memory, input_array, blocks)
+        part_ids = _shared_copy(shared_memory, np.empty(length, dtype=np.uint16), blocks)
+        step = max(1, -(-length // workers))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            ranges = [(start, min(start + step, length)) for start in range(0, length, step)]
+            for future in [pool.submit(_shared_partition_ids, shared, part_ids, start, stop, workers, chunk_size) for start, stop in ranges]:
+                future.result()
+
+            # Stable sort of the partition ids: the indices of each partition stay in index order
+            ids_block, ids = _attach(shared_memory, part_ids)
+            order = np.argsort(ids, kind="stable")
+            offsets = np.concatenate(([0], np.cumsum(np.bincount(ids, minlength=workers))))
+            del ids
+            ids_block.close()
+            order = _shared_copy(shared_memory, order, blocks)
+            futures = [
+                pool.submit(_shared_partition_duplicates, shared, order, int(offsets[part]), int(offsets[part + 1]))
+                for part in range(workers) if offsets[part + 1] > offsets[part]
+            ]
+            results = [future.result() for future in futures]
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    values = np.concatenate([input_array[:0]] + [result[0] for result in results])
+    first_indices = np.concatenate([np.empty(0, dtype=np.int64)] + [result[1] for result in results])
+    return values[np.argsort(first_indices, kind="stable")]
+
+
+def _shared_copy(shared_memory, array, blocks):
+    # Copies an array into a new shared memory block, returns the (name, shape, dtype) handle sent to the workers
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    blocks.append(block)
+    np.ndarray(array.shape, array.dtype, buffer=block.buf)[:] = array
+    return block.name, array.shape, array.dtype.str
+
+
+def _attach(shared_memory, handle):
+    # Shared block and array of a handle. The array must be deleted before the block is closed
+    name, shape, dtype = handle
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+
+
+def _shared_partition_ids(shared, part_ids, start, stop, parts, chunk_size):
+    # Worker task of phase 1: partitions of the values in [start, stop)
+    # Workers share the resource tracker of the parent process, which owns and unlinks the blocks
+    from multiprocessing import shared_memory
+
+    (block, input_array), (ids_block, ids) = _attach(shared_memory, shared), _attach(shared_memory, part_ids)
+    try:
+        for chunk_start in range(start, stop, chunk_size):
+            chunk_stop = min(chunk_start + chunk_size, stop)
+            ids[chunk_start:chunk_stop] = hash_array(input_array[chunk_start:chunk_stop]) % np.uint64(parts)
+    finally:
+        del input_array, ids  # Release the buffers before closing
+        block.close()
+        ids_block.close()
+
+
+def _shared_partition_duplicates(shared, order, start, stop):
+    # Worker task of phase 2: duplicates of one partition, whose indices are order[start:stop]
+    from multiprocessing import shared_memory
+
+    (block, input_array), (order_block, order_array) = _attach(shared_memory, shared), _attach(shared_memory, order)
+    try:
+        indices = order_array[start:stop].copy()
+        return _first_duplicates(input_array[indices], indices)
+    finally:
+        del input_array, order_array
+        block.close()
+        order_block.close()
+
+
+# Out-of-core versions for arrays larger than memory (e.g., np.memmap). The values are hash-partitioned into
+# temporary files in one pass, then each partition is checked in memory. Partitions hold about chunk_size values up to
+# MAX_PARTITIONS * chunk_size values, larger arrays give larger partitions (about len(input_array) / MAX_PARTITIONS values)
+# temp_dir: directory of the temporary files (default: the system temporary directory)
+MAX_PARTITIONS = 256  # Open temporary files during the partitioning pass
+
+
+def detect_duplicates_array_chunked(input_array=None, chunk_size=1 << 20, temp_dir=None):
+    if not isinstance(input_array, np.ndarray):
+        raise TypeError("Input must be a numpy ndarray.")
+    if input_array.ndim != 1:
+        raise ValueError("Input must be a one-dimensional array.")
+    if len(input_array) <= chunk_size:
+        return detect_duplicates_array(np.asarray(input_array))
+
+    values, first_indices = [input_array[:0]], [np.empty(0, dtype=np.int64)]
+    for records in _spill_partitions([input_array], _num_partitions(len(input_array), chunk_size), chunk_size, temp_dir):
+        partition_values, partition_indices = _first_duplicates(records["value0"], records["index"])
+        values.append(partition_values)
+        first_indices.append(partition_indices)
+
+    values, first_indices = np.concatenate(values), np.concatenate(first_indices)
+    return values[np.argsort(first_indices, kind="stable")]
+
+
+# Same output as intersect_arrays(), partition by partition
+def intersect_arrays_chunked(first_array=None, second_array=None, chunk_size=1 << 20, temp_dir=None):
+    parts = _num_partitions(max(len(first_array), len(second_array)), chunk_size)
+    if parts == 1:
+        return intersect_arrays(np.asarray(first_array), np.asarray(second_array))
+
+    values, first_indices, second_indices = [first_array[:0]], [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+    first_partitions = _spill_partitions([first_array], parts, chunk_size, temp_dir)
+    second_partitions = _spill_partitions([second_array], parts, chunk_size, temp_dir)
+    for first_records, second_records in zip(first_partitions, second_partitions):
+        common, first_local, second_local = np.intersect1d(first_records["value0"], second_records["value0"], return_indices=True)
+        values.append(common)
+        first_indices.append(first_records["index"][first_local])
+        second_indices.append(second_records["index"][second_local])
+
+    values, first_indices, second_indices = np.concatenate(values), np.concatenate(first_indices), np.concatenate(second_indices)
+    order = np.argsort(first_indices, kind="stable")
+    return values[order], first_indices[order], second_indices[order]
+
+
+# Function that marks the first occurrence of every distinct value (or tuple of values, for several arrays of equal length)
+# out: optional boolean array for the mask, e.g., a np.memmap when the mask itself does not fit in memory
+# Each partition is checked with first_occurrence_mask(), so the same NaN rule applies
+def first_occurrence_mask_chunked(arrays=None, chunk_size=1 << 20, temp_dir=None, out=None):
+    mask = np.zeros(len(arrays[0]), dtype=bool) if out is None else out
+    mask[:] = False
+    fields = [f"value{i}" for i in range(len(arrays))]
+    for records in _spill_partitions(arrays, _num_partitions(len(arrays[0]), chunk_size), chunk_size, temp_dir):
+        first = first_occurrence_mask([records[field] for field in fields])
+        mask[records["index"][first]] = True
+    return mask
+
+
+def _num_partitions(size, chunk_size):
+    return min(max(1, -(-size // chunk_size)), MAX_PARTITIONS)
+
+
+def _spill_partitions(arrays, parts, chunk_size, temp_dir=None):
+    # Generator: hash-partitions the values of one or more arrays of equal length into temporary files,
+    # then yields the partitions one by one as record arrays with the fields "index", "value0", "value1", ...
+    # Records keep the index order inside each partition
+    record = np.dtype([("index", np.int64)] + [(f"value{i}", array.dtype) for i, array in enumerate(arrays)])
+
+    with tempfile.TemporaryDirectory(dir=temp_dir) as directory:
+        paths = [os.path.join(directory, f"partition{part}.bin") for part in range(parts)]
+        files = [open(path, "wb") for path in paths]
+        try:
+            for start in range(0, len(arrays[0]), chunk_size):
+                chunks = [np.asarray(array[start:start + chunk_size]) for array in arrays]
+                hashes = hash_array(chunks[0])
+                for chunk in chunks[1:]:
+                    hashes = hashes * np.uint64(31) + hash_array(chunk)
+
+                records = np.empty(len(chunks[0]), dtype=record)
+                records["index"] = np.arange(start, start + len(chunks[0]))
+                for i, chunk in enumerate(chunks):
+                    records[f"value{i}"] = chunk
+
+                # Stable sort by partition keeps the index order, then each partition is one contiguous slice
+                partition = hashes % np.uint64(parts)
+                order = np.argsort(partition, kind="stable")
+                bounds = np.searchsorted(partition[order], np.arange(parts + 1, dtype=np.uint64))
+                records = records[order]
+                for part, file in enumerate(files):
+                    file.write(records[bounds[part]:bounds[part + 1]].tobytes())
+        finally:
+            for file in files:
+                file.close()
+
+        for path in paths:
+            yield np.fromfile(path, dtype=record)
@@ -1,4 +1,11 @@
-from utils.functions import is_sorted
+import os
+import pickle
+import sys
+import time
+from functools import partial
+from utils.functions import is_sorted, frozen_key
+from utils.bloom import BloomFilter
+from utils import instrumentation
 
 
 def detect_duplicates_unsorted(input_list=None):
@@ -26,6 +33,215 @@ def detect_duplicates_sorted(input_list=None):
     return duplicates
 
 
+def detect_duplicates_hashed(input_list=None):
+    # Time complexity O(n) for hashable elements, where n is the number of elements in the list
+    detector = DuplicateDetector()
+    detector.update(input_list)
+    return detector.result()
+
+
+# Memory-bounded detection: a Bloom filter marks the elements that were possibly seen before (candidates),
+# then an exact pass runs only on the candidates, so the output is identical to detect_duplicates_hashed()
+# error_rate: false positive rate of the filter. max_bytes: memory budget of the filter
+# report: optional dictionary, filled with the memory used and the number of rejected candidates
+def detect_duplicates_approximate(input_list=None, error_rate=0.01, max_bytes=None, report=None):
+    bloom = BloomFilter(len(input_list), error_rate, max_bytes)
+    candidates = set()  # Keys of the elements that were possibly seen before
+
+    # 1st pass: probabilistic pre-filter
+    for item in input_list:
+        key = _candidate_key(item)
+        if key is _OPAQUE:  # Opaque objects cannot be hashed, they are always confirmed exactly
+            continue
+        if bloom.add(hash(key)):
+            candidates.add(key)
+
+    # 2nd pass: exact confirmation over the candidates only
+    # The relative order of the elements is kept, so the first occurrences are in the same order
+    detector = DuplicateDetector()
+    for item in input_list:
+        key = _candidate_key(item)
+        if key is _OPAQUE or key in candidates:
+            detector.add(item)
+    duplicates = detector.result()
+
+    if report is not None:
+        candidate_bytes = sys.getsizeof(candidates) + sys.getsizeof(detector._seen)
+        report.update({
+            "filter_bytes": bloom.nbytes,
+            "filter_hashes": bloom.num_hashes,
+            "candidate_bytes": candidate_bytes,
+            "memory_bytes": bloom.nbytes + candidate_bytes,
+            "candidates": len(candidates),
+            "rejected": len(candidates) - len(duplicates),
+        })
+
+    return duplicates
+
+
+# Multi-core detection: the list is split in chunks, each worker process returns the position of the first occurrence
+# and the count of every key in its chunk. Keys are rebuilt in the parent from the original elements, so elements compared
+# by identity still match across chunks. The maps are merged in chunk order, which gives the same output as the serial engines
+# Lists that cannot be pickled (e.g., lambdas) are checked by the serial engine
+# workers: number of processes (default: number of CPUs). chunk_size: elements per task (default: one chunk per worker)
+def detect_duplicates_parallel(input_list=None, workers=None, chunk_size=None):
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or max(1, -(-len(input_list) // workers))
+    chunks = [(input_list[start:start + chunk_size], start) for start in range(0, len(input_list), chunk_size)]
+
+    # Loaded on first use, most callers never start a pool
+    from concurrent.futures import ProcessPoolExecutor
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_chunk_occurrences, *zip(*chunks))) if chunks else []
+    except (pickle.PicklingError, AttributeError, TypeError):  # Elements that cannot be sent to the workers
+        return detect_duplicates_hashed(input_list)
+
+    # Chunks are merged in order, so the dictionary keeps the order of the first occurrences
+    merged = {}  # key -> [position of first occurrence, count]
+    opaque_positions = []
+    for occurrences, chunk_opaque in results:
+        for position, count in occurrences:
+            key = _candidate_key(input_list[position])
+            entry = merged.get(key)
+            if entry is None:
+                merged[key] = [position, count]
+            else:
+                entry[1] += count
+        opaque_positions.extend(chunk_opaque)
+
+    duplicates = [(position, input_list[position]) for position, count in merged.values() if count > 1]
+
+    # Opaque objects cannot be merged by key, they are compared in the parent process
+    if opaque_positions:
+        opaque = []  # [position of first occurrence, first occurrence, is duplicate]
+        for position in opaque_positions:
+            item = input_list[position]
+            entry = _scan_opaque(opaque, item)
+            if entry is None:
+                opaque.append([position, item, False])
+            else:
+                entry[2] = True
+        duplicates.extend((entry[0], entry[1]) for entry in opaque if entry[2])
+        duplicates.sort(key=lambda duplicate: duplicate[0])
+
+    return [item for _, item in duplicates]
+
+
+def _chunk_occurrences(chunk, offset):
+    # Worker task: first occurrence (global position) and count of every key in a chunk
+    # Only positions are sent back, the keys of the worker are copies of the elements
+    occurrences = {}
+    opaque_positions = []
+    for position, item in enumerate(chunk, offset):
+        key = _candidate_key(item)
+        if key is _OPAQUE:
+            opaque_positions.append(position)
+            continue
+        entry = occurrences.get(key)
+        if entry is None:
+            occurrences[key] = [position, 1]
+        else:
+            entry[1] += 1
+    return list(occurrences.values()), opaque_positions
+
+
+_OPAQUE = object()
+
+
+def _candidate_key(item):
+    # Same key tiers as DuplicateDetector. _OPAQUE for opaque objects
+    try:
+        hash(item)
+        return item
+    except TypeError:
+        try:
+            return frozen_key(item)
+        except TypeError:
+            return _OPAQUE
+
+
+# Class for incremental duplicate detection on streams of elements
+# Elements are given one at a time (add), in chunks (update) or as a generator (feed)
+# Memory is one entry per distinct element, the same equality and hashing semantics as detect_duplicates() are used
+class DuplicateDetector:
+    def __init__(self):
+        # Tiers: 1) the element itself is the key   2) a frozen key for unhashable containers (lists, dicts, sets)
+        #        3) an equality scan, only for opaque objects that cannot be frozen
+        self._seen = {}  # key -> [position of first occurrence, first occurrence, is duplicate]
+        self._opaque = []  # [position of first occurrence, first occurrence, is duplicate]
+        self._position = 0  # Number of elements seen so far
+
+    def __len__(self):
+        return self._position
+
+    # Returns True if the element is seen for the second time, i.e. it is a new duplicate
+    def add(self, item):
+        return self._add(item) is not None
+
+    # Adds a chunk of elements. Returns the new duplicates of the chunk (first occurrences), in the order they were found
+    def update(self, iterable):
+        return [entry[1] for entry in map(self._add, iterable) if entry is not None]
+
+    # Generator that yields each new duplicate (its first occurrence) the moment it is found
+    def feed(self, iterable):
+        for item in iterable:
+            entry = self._add(item)
+            if entry is not None:
+                yield entry[1]
+
+    # The duplicates seen so far, in the order of their first occurrence (same output as detect_duplicates)
+    def result(self):
+        # Dictionary keeps insertion order, i.e. the order of the first occurrences
+        duplicates = [entry for entry in self._seen.values() if entry[2]]
+        opaque_duplicates = [entry for entry in self._opaque if entry[2]]
+        if opaque_duplicates:
+            duplicates = sorted(duplicates + opaque_duplicates, key=lambda entry: entry[0])
+
+        return [entry[1] for entry in duplicates]
+
+    # Returns the entry of the element if it is a new duplicate, else None
+    def _add(self, item):
+        position = self._position
+        self._position += 1
+
+        try:
+            entry = self._seen.get(item)
+            key = item
+        except TypeError:  # Unhashable element
+            try:
+                key = frozen_key(item)
+            except TypeError:
+                entry = _scan_opaque(self._opaque, item)
+                if entry is None:
+                    self._opaque.append([position, item, False])
+                    return None
+                return self._mark(entry)
+            entry = self._seen.get(key)
+
+        if entry is None:
+            self._seen[key] = [position, item, False]
+            return None
+        return self._mark(entry)
+
+    @staticmethod
+    def _mark(entry):
+        # Only the second occurrence makes a new duplicate
+        if entry[2]:
+            return None
+        entry[2] = True
+        return entry
+
+
+def _scan_opaque(opaque, item):
+    # Equality scan over the distinct opaque objects seen so far
+    for entry in opaque:
+        if entry[1] == item:
+            return entry
+    return None
+
+
 # ----------------------------------- #
 # ----------------------------------- #
 # The function for exercise 1 follows #
@@ -33,17 +249,62 @@ def detect_duplicates_sorted(input_list=None):
 # ----------------------------------- #
 
 # 1)
-def detect_duplicates(input_list=None):
-    duplicates = []
+# sorted_hint: True or False when the caller already knows if the list is sorted, skips the is_sorted() check
+# approximate: use the memory-bounded engine, see detect_duplicates_approximate() for the other arguments
+# workers: number of processes for the multi-core engine, see detect_duplicates_parallel()
+# cache: optional ResultCache (utils/cache.py). Results are keyed by the content of the list, and shared by all engines.
+#        Only lists of plain values (numbers, strings, bytes, tuples of these, see is_plain_value) are cached. Calls with a report bypass it
+# profile: True (or a callback for the event) to record the allocated memory and cProfile statistics of this call,
+#          see utils/instrumentation.py. Listeners of the instrumentation receive an event for every call
+def detect_duplicates(input_list=None, sorted_hint=None, approximate=False, error_rate=0.01, max_bytes=None, report=None, workers=None, cache=None, profile=False):
     # Function accepts only list types on its input
     if not isinstance(input_list, list):
         raise TypeError("Input must be a list.")
 
+    arguments = (input_list, sorted_hint, approximate, error_rate, max_bytes, report, workers, cache)
+    if not (profile or instrumentation.listeners):
+        return _detect_duplicates(*arguments)
+
+    event = {"function": "detect_duplicates", "engine": None, "elements": len(input_list), "is_sorted_seconds": 0.0}
+    with instrumentation.measure(event, profile):
+        duplicates = _detect_duplicates(*arguments, event)
+    event["duplicates"] = len(duplicates)
+    instrumentation.emit(event, profile)
+    return duplicates
+
+
+def _detect_duplicates(input_list, sorted_hint, approximate, error_rate, max_bytes, report, workers, cache, event=None):
+    # Engine selection. The chosen engine and the time of the sortedness check are recorded in the event
+    # Calls with a report bypass the cache, so the engine always fills the report
+    if cache is not None and report is None:
+        _record(event, "engine", "cache")  # Replaced by the engine on a miss
+        compute = partial(_detect_duplicates, input_list, sorted_hint, approximate, error_rate, max_bytes, report, workers, None, event)
+        return list(cache.cached("detect_duplicates", input_list, compute))  # A copy, the cached list stays unchanged
+
+    if approximate:
+        _record(event, "engine", "approximate")
+        return detect_duplicates_approximate(input_list, error_rate, max_bytes, report)
+    if workers is not None and workers > 1:
+        _record(event, "engine", "parallel")
+        return detect_duplicates_parallel(input_list, workers)
+
+    if sorted_hint is None:
+        start = time.perf_counter() if event is not None else 0
+        sorted_hint = is_sorted(input_list)
+        _record(event, "is_sorted_seconds", time.perf_counter() - start if event is not None else 0)
+
     # If sorted, use a more efficient algorithm
-    if is_sorted(input_list):
+    if sorted_hint:
+        _record(event, "engine", "sorted")
         duplicates = detect_duplicates_sorted(input_list)
 
     else:
-        duplicates = detect_duplicates_unsorted(input_list)
+        _record(event, "engine", "hashed")
+        duplicates = detect_duplicates_hashed(input_list)
 
     return duplicates
+
+
+def _record(event, name, value):
+    if event is not None:
+        event[name] = value
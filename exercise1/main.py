@@ -1,6 +1,12 @@
 import os
+import sys
 import ast
-from detect_duplicates import detect_duplicates
+import json
+import time
+import argparse
+import contextlib
+from itertools import islice
+from detect_duplicates import detect_duplicates, DuplicateDetector
 
 
 def get_list():
@@ -35,11 +41,138 @@ def get_list():
 def save_list(input_list, filepath):
     # Function to save the input_list in a .txt file
     with open(filepath, 'w') as file:
-        for item in input_list:
-            file.write(str(item) + '\n')
+        write_items(input_list, file)
 
 
-def main():
+# Writes one item per line, in batches of lines (one write call per batch). Returns the number of items
+def write_items(items, file, batch_size=4096):
+    count = 0
+    items = iter(items)
+    while True:
+        batch = [str(item) + '\n' for item in islice(items, batch_size)]
+        if not batch:
+            return count
+        file.write(''.join(batch))
+        count += len(batch)
+
+
+# Values of an input file ('-' for the standard input)
+# input_format: 'lines' (one value per line, read lazily), 'json' (JSON array) or 'npy' (NumPy array, memory-mapped)
+# literal: evaluate each line as a Python literal, otherwise the lines are strings
+def read_values(path, input_format, literal=False):
+    if input_format == "npy":
+        import numpy as np
+        return np.load(path if path != "-" else sys.stdin.buffer, mmap_mode="r" if path != "-" else None)
+
+    if input_format == "json":
+        with _open_text(path) as file:
+            values = json.load(file)
+        if not isinstance(values, list):
+            raise ValueError("input must be a JSON array.")
+        return values
+    return _read_lines(path, literal)
+
+
+def _read_lines(path, literal):
+    with _open_text(path) as file:
+        for number, line in enumerate(file, 1):
+            line = line.rstrip('\n')
+            if not literal:
+                yield line
+                continue
+            try:
+                yield ast.literal_eval(line)
+            except (ValueError, SyntaxError) as error:
+                raise ValueError(f"line {number}: invalid literal {line!r}") from error
+
+
+def _open_text(path):
+    # The standard input is not closed at the end of the with block, only the files opened here
+    return contextlib.nullcontext(sys.stdin) if path == "-" else open(path, 'r')
+
+
+# Checks one input for duplicates and writes them to the output file, in the order of their first occurrence
+# (the order of detect_duplicates() for every input format). Returns the number of elements and duplicates
+def process(values, output):
+    if hasattr(values, "ndim"):  # NumPy array, vectorized detection
+        from array_duplicates import detect_duplicates_array
+        return values.size, write_items(detect_duplicates_array(values.ravel()).tolist(), output)
+
+    detector = DuplicateDetector()
+    detector.update(values)
+    return len(detector), write_items(detector.result(), output)
+
+
+# Checks one input file, to the standard output if output_path is None. The output file is removed if the input fails
+def _process_input(path, input_format, literal, output_path):
+    if output_path is None:
+        return process(read_values(path, input_format, literal), sys.stdout)
+
+    output = open(output_path, 'w')
+    try:
+        with output:
+            return process(read_values(path, input_format, literal), output)
+    except Exception:
+        os.remove(output_path)  # No partial results
+        raise
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Detect duplicate elements. Without arguments, runs interactively.")
+    parser.add_argument("inputs", nargs="+", help="input files, '-' for the standard input")
+    parser.add_argument("--format", choices=["lines", "json", "npy"], help="input format (default: from the file extension, else lines)")
+    parser.add_argument("--literal", action="store_true", help="evaluate each line as a Python literal (lines format)")
+    parser.add_argument("-o", "--output", default="-",
+                        help="output file, '-' for the standard output (default). With several inputs, a directory for <input>.duplicates.txt files")
+    parser.add_argument("--timing", action="store_true", help="print the time and throughput of each input to the standard error")
+    args = parser.parse_args(argv)
+
+    # Inputs with the same file name would overwrite each other's output file
+    if len(args.inputs) > 1 and args.output != "-":
+        names = {}
+        for path in args.inputs:
+            other = names.setdefault(os.path.basename(path), path)
+            if other != path or args.inputs.count(path) > 1:
+                parser.error(f"inputs {other} and {path} would both be written to {os.path.basename(path)}.duplicates.txt")
+    return args
+
+
+# Non-interactive mode, for batch jobs. Each input is checked on its own, an input that cannot be read is reported
+# on the standard error and the next inputs are still checked. Returns the exit status: 1 if any input failed, else 0
+def run(args):
+    several = len(args.inputs) > 1
+    if several and args.output != "-":
+        os.makedirs(args.output, exist_ok=True)
+
+    status = 0
+    for path in args.inputs:
+        input_format = args.format or {".json": "json", ".npy": "npy"}.get(os.path.splitext(path)[1], "lines")
+        if args.output == "-":
+            output_path = None
+        elif several:
+            output_path = os.path.join(args.output, os.path.basename(path) + ".duplicates.txt")
+        else:
+            output_path = args.output
+
+        start = time.perf_counter()
+        try:
+            elements, duplicates = _process_input(path, input_format, args.literal, output_path)
+        except (OSError, ValueError) as error:
+            print(f"{path}: error: {error}", file=sys.stderr)
+            status = 1
+            continue
+        seconds = time.perf_counter() - start
+
+        if args.timing:
+            rate = elements / seconds if seconds else float("inf")
+            print(f"{path}: {elements} elements, {duplicates} duplicates, {seconds:.3f} s, {rate:.0f} elements/s", file=sys.stderr)
+    return status
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        return run(parse_args(argv))
 
     print('Running exercise 1 for the duplicate element detection...\n')
     print("Please provide a comma-separated list of objects.\n")
@@ -59,4 +192,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -1,13 +1,19 @@
+import os
+import shutil
+import tempfile
+from functools import partial
 import numpy as np
-from astropy import units as u
-from detect_duplicates import detect_duplicates
-import matplotlib.pyplot as plt
-import pandas as pd
+from array_duplicates import detect_duplicates_array, detect_duplicates_array_approximate, detect_duplicates_array_parallel, is_sorted_array, intersect_arrays
+from array_duplicates import cluster_near_duplicates, intersect_arrays_tolerance
+from array_duplicates import detect_duplicates_array_chunked, intersect_arrays_chunked, first_occurrence_mask_chunked, first_occurrence_mask
+from utils import instrumentation
 
 
 # Class for signals
+# rng: np.random.Generator or seed for the duplicates introduced with duplicate_chance. They are introduced lazily,
+#      the first time the signal is read, and their indices are kept in the injected attribute (ground truth)
 class Signal:
-    def __init__(self, signal_type, signal, units=frozenset(), duplicate_chance=0, axis="y"):
+    def __init__(self, signal_type, signal, units=frozenset(), duplicate_chance=0, axis="y", rng=None):
         if duplicate_chance < 0 or duplicate_chance > 1:
             raise ValueError("Invalid duplicate_chance argument. Allowed values are between '0' and '1'.")
         if axis not in ["x", "y", "both", None]:
@@ -17,57 +23,307 @@ class Signal:
         self.units = units
         self.duplicate_chance = duplicate_chance
         self.axis = axis
-        self.introduce_duplicates()
+        self.chunk_size = None  # Values per chunk for out-of-core processing, None for signals in memory
+        self.cache = None  # Optional ResultCache (utils/cache.py) for the duplicate scans
+        self.rng = np.random.default_rng(rng)
+        self.injected = {}  # Axis -> indices modified by introduce_duplicates()
+        self._pending_duplicates = duplicate_chance != 0
+
+    # Signal backed by a memory-mapped file, the samples are read from disk on demand
+    # The file holds the x axis followed by the y axis, i.e. a (2, N) array in C order. shape: (2, N), inferred when None
+    # mode: 'r' read-only, 'r+' to allow remove_duplicates(inplace=True) to rewrite the file
+    # Duplicate detection, intersections and remove_duplicates() run chunk by chunk, chunk_size values at a time
+    @classmethod
+    def from_file(cls, path, dtype=np.float64, shape=None, signal_type=None, units=frozenset(), axis="y", mode="r", offset=0, chunk_size=1 << 20):
+        signal = np.memmap(path, dtype=dtype, mode=mode, offset=offset, shape=shape)
+        if shape is None:
+            if len(signal) % 2:
+                raise ValueError("Signal file must hold two axes of equal length.")
+            signal = signal.reshape(2, -1)
+        if signal.ndim != 2 or signal.shape[0] != 2:
+            raise ValueError("Invalid shape. Signals have the shape (2, N).")
+
+        if signal_type is None:
+            signal_type = os.path.splitext(os.path.basename(path))[0]
+        instance = cls(signal_type, signal, units, axis=axis)
+        instance.chunk_size = chunk_size
+        return instance
+
+    @property
+    def signal(self):
+        if self._pending_duplicates:
+            self.introduce_duplicates()
+        return self._signal
+
+    # Assigning a new signal clears the cached checks of the previous one
+    @signal.setter
+    def signal(self, signal):
+        self._signal = signal
+        self._pending_duplicates = False
+        self._invalidate()
+
+    # Cached checks on the signal data. Methods that modify the signal in place must call _invalidate()
+    def _invalidate(self):
+        self._verdicts = {}
+
+    # Sortedness of an axis (0 for x, 1 for y), computed once and reused. e.g., time axes are usually sorted
+    def _is_sorted(self, index):
+        key = ("sorted", index)
+        if key not in self._verdicts:
+            self._verdicts[key] = is_sorted_array(self.signal[index])
+        return self._verdicts[key]
+
+    # True if an axis (0 for x, 1 for y) has no duplicates. Reuses the verdict of a previous scan of the same data
+    def _is_duplicate_free(self, index):
+        key = ("duplicate_free", index)
+        if key not in self._verdicts:
+            self._axis_duplicates(index)
+        return self._verdicts[key]
+
+    # Exact duplicates of an axis, chunk by chunk for file-backed signals. Caches the duplicate-free verdict
+    # cache: optional ResultCache (utils/cache.py), results are shared between signals with the same data
+    # use_cache: False to compute the result even when a cache is set, e.g., when the engine fills a report
+    def _axis_duplicates(self, index, compute=None, cache=None, use_cache=True):
+        if compute is None:
+            if self.chunk_size is not None:
+                compute = partial(detect_duplicates_array_chunked, self.signal[index], self.chunk_size)
+            else:
+                compute = partial(detect_duplicates_array, self.signal[index], sorted_hint=self._is_sorted(index))
+
+        cache = self.cache if cache is None else cache
+        if cache is not None and use_cache:
+            # All engines give the same output, so they share one cache entry
+            duplicates = cache.cached("detect_duplicates_array", self.signal[index], compute)
+        else:
+            duplicates = compute()
+        self._verdicts[("duplicate_free", index)] = len(duplicates) == 0
+        return duplicates
 
     # Class-specific detection on desired axis
-    def _detect_duplicates(self):
-        duplicates = []
-        if self.axis == "x" or self.axis == "both":
-            duplicates.extend(detect_duplicates(list(self.signal[0])))
-        if self.axis == "y" or self.axis == "both":
-            duplicates.extend(detect_duplicates(list(self.signal[1])))
-
+    # approximate: memory-bounded detection, see detect_duplicates_array_approximate(). The report is filled per axis
+    # workers: number of processes for multi-core detection, see detect_duplicates_array_parallel()
+    # cache: optional ResultCache for the results, the cache attribute of the signal is used by default. Calls with a report bypass it
+    # profile: True (or a callback) to record memory and cProfile statistics, like detect_duplicates() on lists
+    def _detect_duplicates(self, approximate=False, error_rate=0.01, max_bytes=None, report=None, workers=None, cache=None, profile=False):
+        arguments = (approximate, error_rate, max_bytes, report, workers, cache)
+        if not (profile or instrumentation.listeners):
+            return self._axes_duplicates(*arguments)
+
+        engine = "approximate" if approximate else "parallel" if workers is not None and workers > 1 else "chunked" if self.chunk_size is not None else "array"
+        elements = sum(self.signal.shape[1] for name in ("x", "y") if self.axis in (name, "both"))
+        event = {"function": "Signal._detect_duplicates", "signal_type": self.signal_type, "axis": self.axis, "engine": engine, "elements": elements}
+        with instrumentation.measure(event, profile):
+            duplicates = self._axes_duplicates(*arguments)
+        event["duplicates"] = len(duplicates)
+        instrumentation.emit(event, profile)
         return duplicates
 
-    # Function that introduces duplicates with a probability
-    def introduce_duplicates(self):
-        modifying_signals = []
-        if self.axis == "x" or self.axis == "both":
-            modifying_signals.append(self.signal[0])
-        if self.axis == "y" or self.axis == "both":
-            modifying_signals.append(self.signal[1])
+    def _axes_duplicates(self, approximate, error_rate, max_bytes, report, workers, cache):
+        # Vectorized detection on the ndarray axes, only the duplicates are converted to Python floats
+        duplicates = []
+        for name, index in (("x", 0), ("y", 1)):
+            if self.axis != name and self.axis != "both":
+                continue
+            compute = None  # Default engine
+            if approximate:
+                axis_report = None if report is None else report.setdefault(name, {})
+                chunk_size = self.chunk_size or 1 << 16
+                compute = partial(detect_duplicates_array_approximate, self.signal[index], error_rate, max_bytes, chunk_size, axis_report)
+            elif workers is not None and workers > 1:
+                compute = partial(detect_duplicates_array_parallel, self.signal[index], workers)
+            duplicates.extend(self._axis_duplicates(index, compute, cache, use_cache=report is None).tolist())
 
-        for signal in modifying_signals:
-            if self.duplicate_chance != 0:
-                size = len(signal)
-                num_duplicates = int(size * self.duplicate_chance)
+        return duplicates
 
-                if num_duplicates > 0:
-                    indices = np.random.choice(size, num_duplicates, replace=False)
-                    signal[indices] = np.random.choice(signal, num_duplicates)
+    # Function that introduces duplicates with a probability: values of the signal are copied to random indices
+    # Returns the modified indices of each axis (ground truth), also kept in the injected attribute
+    def introduce_duplicates(self, rng=None):
+        self._pending_duplicates = False
+        rng = self.rng if rng is None else np.random.default_rng(rng)
+        injected = {}
+        for name, index in (("x", 0), ("y", 1)):
+            if self.axis != name and self.axis != "both":
+                continue
+            signal = self._signal[index]
+            size = len(signal)
+            num_duplicates = int(size * self.duplicate_chance)
+
+            if num_duplicates > 0:
+                indices = rng.choice(size, num_duplicates, replace=False)
+                signal[indices] = signal[rng.integers(0, size, num_duplicates)]
+                injected[name] = np.sort(indices)
+
+        if injected:
+            self.injected.update(injected)
+            self._invalidate()
+        return injected
 
     # Function to find intersections between two signals of the same type
-    def signal_intersections(self, other, axis):
+    # Returns the common values, in the order of their first occurrence in this signal
+    # return_indices: also return the indices of the common values in this and in the other signal
+    # atol, rtol: values match within tolerance, see intersect_arrays_tolerance(). The values of this signal are returned
+    def signal_intersections(self, other, axis, return_indices=False, atol=0.0, rtol=0.0):
         if not isinstance(other, Signal):
             raise ValueError("Input must be a Signal object.")
         if self.signal_type != other.signal_type:
             raise ValueError("Signals must be of the same type for comparison.")
-        if self._detect_duplicates() or other._detect_duplicates():
+        if not (self._has_no_anomalies() and other._has_no_anomalies()):
             raise ValueError("Signals have anomalies. To compare signals for intersection they should be free of duplicate values.")
 
+        index = self._axis_index(axis)
+
+        if atol or rtol:
+            indices, other_indices = intersect_arrays_tolerance(self.signal[index], other.signal[index], atol, rtol)
+            values = self.signal[index][indices]
+            if return_indices:
+                return values.tolist(), indices, other_indices
+            return values.tolist()
+
+        # Partitioned merge for file-backed signals
+        if self.chunk_size is not None or other.chunk_size is not None:
+            chunk_size = min(size for size in (self.chunk_size, other.chunk_size) if size is not None)
+            values, indices, other_indices = intersect_arrays_chunked(self.signal[index], other.signal[index], chunk_size)
+            if return_indices:
+                return values.tolist(), indices, other_indices
+            return values.tolist()
+
+        # Sorted merge of the two axes. The unique-values step is skipped when both axes are known to be duplicate-free
+        assume_unique = self._verdicts.get(("duplicate_free", index), False) and other._verdicts.get(("duplicate_free", index), False)
+        values, indices, other_indices = intersect_arrays(self.signal[index], other.signal[index], assume_unique)
+
+        if return_indices:
+            return values.tolist(), indices, other_indices
+        return values.tolist()
+
+    # Function to find clusters of near-equal samples on one axis, e.g., duplicates after ADC quantization
+    # Returns the indices of every cluster, see cluster_near_duplicates()
+    def near_duplicates(self, axis, atol=0.0, rtol=0.0):
+        return cluster_near_duplicates(self.signal[self._axis_index(axis)], atol, rtol)
+
+    @staticmethod
+    def _axis_index(axis):
         if axis == "x":
-            intersections = detect_duplicates(list(self.signal[0]) + list(other.signal[0]))
-        elif axis == "y":
-            intersections = detect_duplicates(list(self.signal[1]) + list(other.signal[1]))
+            return 0
+        if axis == "y":
+            return 1
+        raise ValueError("Invalid axis. Allowed values are 'x' or 'y'")
+
+    # True if the axes of the signal have no duplicates, i.e. _detect_duplicates() finds nothing
+    def _has_no_anomalies(self):
+        indices = {"x": (0,), "y": (1,), "both": (0, 1), None: ()}[self.axis]
+        return all(self._is_duplicate_free(index) for index in indices)
+
+    # Function that drops the samples whose value on the axis ('x', 'y' or 'both' for the pair) appeared before
+    # Returns the mask of the kept samples, to filter other arrays of the same length consistently
+    # inplace: move the kept samples forward in the existing buffer, the signal becomes a view of it (no copy of the signal).
+    #          Otherwise a new array is created and the previous one is left unchanged
+    # File-backed signals are processed chunk by chunk, their file is never truncated under an existing map:
+    # - inplace=False: the kept samples are written to a new file (path, or an anonymous temporary file) and mapped.
+    #   The source file is left unchanged, it may be opened read-only
+    # - inplace=True: the source file (opened with mode='r+') is rewritten with the kept samples. The new file replaces
+    #   the old one, so arrays that still map the old file keep their samples
+    def remove_duplicates(self, axis, inplace=False, path=None):
+        indices = {"x": (0,), "y": (1,), "both": (0, 1)}.get(axis)
+        if indices is None:
+            raise ValueError("Invalid axis. Allowed values are 'x' or 'y' or 'both'.")
+
+        if self.chunk_size is None:
+            keep = first_occurrence_mask([self.signal[index] for index in indices])
+            if inplace:
+                self._compact(keep, self.signal.shape[1])
+            else:
+                self.signal = self.signal[:, keep]
+            return keep
+
+        keep = first_occurrence_mask_chunked([self.signal[index] for index in indices], self.chunk_size)
+        file_backed = isinstance(self.signal, np.memmap) and self.signal.filename is not None and self.signal.mode != "c"
+        if inplace and file_backed:
+            self._rewrite_file(keep)
+        elif inplace:  # Copy-on-write maps and arrays in memory, only the buffer is compacted
+            self._compact(keep, self.chunk_size)
         else:
-            raise ValueError("Invalid axis. Allowed values are 'x' or 'y'")
-
-        return intersections
+            self.signal = self._write_kept(keep, path)
+        return keep
+
+    # Moves the kept samples forward, chunk by chunk. The kept x values are written at the start of the buffer and
+    # the kept y values right after them, so the signal becomes a contiguous (2, kept) array
+    def _compact(self, keep, chunk_size):
+        signal = self.signal
+        if not signal.flags.writeable:
+            raise ValueError("Signal is read-only. Open signal files with mode='r+' to remove duplicates in place.")
+
+        kept = int(np.count_nonzero(keep))
+        if not signal.flags.c_contiguous:  # Views of other arrays are compacted row by row
+            for row in signal:
+                self._compact_row(row, row, 0, keep, chunk_size)
+            self.signal = signal[:, :kept]
+            return
+
+        # Writing position never passes the reading position, so chunks are read before they are overwritten
+        flat = signal.reshape(-1)
+        position = 0
+        for row in signal:
+            position = self._compact_row(row, flat, position, keep, chunk_size)
+        self.signal = flat[:2 * kept].reshape(2, kept)
+
+    @staticmethod
+    def _compact_row(row, out, position, keep, chunk_size):
+        # Writes the kept values of a row to out, from position. Returns the position after the last written value
+        chunk_size = max(chunk_size, 1)
+        for start in range(0, len(row), chunk_size):
+            chunk = row[start:start + chunk_size][keep[start:start + chunk_size]]
+            out[position:position + len(chunk)] = chunk
+            position += len(chunk)
+        return position
+
+    # Writes the kept samples to a new file, x axis first, and returns the memory map of the new (2, kept) signal
+    # path: None for an anonymous temporary file, removed by the system once the signal is no longer mapped
+    def _write_kept(self, keep, path=None):
+        source = getattr(self.signal, "filename", None)
+        if path is not None and source is not None and os.path.exists(path) and os.path.samefile(path, source):
+            raise ValueError("Cannot write the signal to its own file. Use inplace=True to rewrite the file.")
+
+        kept = int(np.count_nonzero(keep))
+        file = tempfile.TemporaryFile() if path is None else open(path, "w+b")
+        with file:
+            self._write_rows(file, keep)
+            file.flush()
+            if kept == 0:  # Empty files cannot be mapped
+                return np.empty((2, 0), dtype=self.signal.dtype)
+            return np.memmap(file, dtype=self.signal.dtype, mode="r+", shape=(2, kept))
+
+    # Rewrites the file of the signal with the kept samples. The data before the signal (offset) and after it is kept.
+    # The new file is written next to the old one and replaces it, readers of the old file never see a partial or shorter file
+    def _rewrite_file(self, keep):
+        signal = self.signal
+        if not signal.flags.writeable:
+            raise ValueError("Signal is read-only. Open signal files with mode='r+' to remove duplicates in place.")
+
+        kept = int(np.count_nonzero(keep))
+        path = signal.filename
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as file, open(path, "rb") as source:
+                file.write(source.read(signal.offset))
+                self._write_rows(file, keep)
+                source.seek(signal.offset + signal.nbytes)
+                shutil.copyfileobj(source, file)
+            shutil.copymode(path, temporary)
+            os.replace(temporary, path)
+        except BaseException:
+            os.remove(temporary)
+            raise
+        if kept == 0:
+            self.signal = np.empty((2, 0), dtype=signal.dtype)
+        else:
+            self.signal = np.memmap(path, dtype=signal.dtype, mode="r+", offset=signal.offset, shape=(2, kept))
 
-    def remove_duplicates(self, axis):
-        df = pd.DataFrame({'x': self.signal[0], 'y': self.signal[1]})
-        df.drop_duplicates(subset=axis, inplace=True)  # Will drop duplicates on specified axis
-        self.signal = np.array((df['x'].values, df['y'].values))
+    def _write_rows(self, file, keep):
+        # Writes the kept values of both axes to a binary file, chunk by chunk
+        chunk_size = max(self.chunk_size or self.signal.shape[1], 1)
+        for row in self.signal:
+            for start in range(0, len(row), chunk_size):
+                file.write(np.ascontiguousarray(row[start:start + chunk_size][keep[start:start + chunk_size]]).tobytes())
 
     def display(self):
         print(f"Signal Type: {self.signal_type}")
@@ -77,7 +333,135 @@ class Signal:
         print(f"Duplicate Chance: {self.duplicate_chance}")
 
 
+# Class for many signals of the same type, e.g., all the BPM channels of a shot
+# Columnar storage: one contiguous (2, total) array with the signals next to each other, and the offsets of each signal
+# Duplicates and intersections of the whole set are found with one vectorized call instead of a loop over Signal objects
+class SignalSet:
+    def __init__(self, signal_type, arrays=(), units=frozenset()):
+        arrays = [np.asarray(array) for array in arrays]
+        if any(array.ndim != 2 or array.shape[0] != 2 for array in arrays):
+            raise ValueError("Invalid shape. Signals have the shape (2, N).")
+        self.signal_type = signal_type
+        self.units = units
+        self.offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+        np.cumsum([array.shape[1] for array in arrays], out=self.offsets[1:])
+        self.data = np.concatenate(arrays, axis=1) if arrays else np.empty((2, 0))
+
+    @classmethod
+    def from_signals(cls, signals):
+        signals = list(signals)
+        if not signals:
+            raise ValueError("At least one signal is needed.")
+        if any(signal.signal_type != signals[0].signal_type for signal in signals):
+            raise ValueError("Signals must be of the same type.")
+        return cls(signals[0].signal_type, [signal.signal for signal in signals], signals[0].units)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    # Signal i, as a view of the columnar storage
+    def __getitem__(self, i):
+        if not -len(self) <= i < len(self):
+            raise IndexError("Signal index out of range.")
+        i %= len(self)
+        return Signal(self.signal_type, self.data[:, self.offsets[i]:self.offsets[i + 1]], self.units)
+
+    # Duplicates inside each signal of the set, on the desired axis
+    # Returns a report with one row per duplicate value: the signal, the index of its first occurrence in that signal,
+    # the value and the number of occurrences. Rows are ordered by signal and index
+    def detect_duplicates(self, axis="y"):
+        values = self.data[Signal._axis_index(axis)]
+        starts, counts, order = self._value_groups(values)
+        repeated = counts > 1
+        positions = order[starts[repeated]]
+        signal_ids = self._signal_ids()[positions]
+
+        report = np.empty(len(positions), dtype=[("signal", np.intp), ("index", np.intp), ("value", values.dtype), ("count", np.intp)])
+        report["signal"] = signal_ids
+        report["index"] = positions - self.offsets[signal_ids]
+        report["value"] = values[positions]
+        report["count"] = counts[repeated]
+        return report[np.lexsort((report["index"], report["signal"]))]
+
+    # Values shared by two signals of the set, on the desired axis
+    # Returns a report with one row per pair of signals and common value: both signals, the index of the value
+    # (first occurrence) in each of them, and the value. Rows are ordered by the first signal and index
+    def intersections(self, axis="y"):
+        values = self.data[Signal._axis_index(axis)]
+        signal_ids = self._signal_ids()
+
+        # First occurrence of every distinct value of every signal
+        starts, _, order = self._value_groups(values)
+        positions = order[starts]
+
+        # Group the first occurrences by value. Inside each group the signals are distinct and in ascending order
+        by_value = positions[np.lexsort((signal_ids[positions], values[positions]))]
+        sorted_values = values[by_value]
+        new_value = np.ones(len(by_value), dtype=bool)
+        new_value[1:] = sorted_values[1:] != sorted_values[:-1]
+        group_starts = np.flatnonzero(new_value)
+        group_sizes = np.diff(np.append(group_starts, len(by_value)))
+
+        # Every element is paired with the later elements of its group
+        rank = np.arange(len(by_value)) - np.repeat(group_starts, group_sizes)
+        partners = np.repeat(group_sizes, group_sizes) - 1 - rank
+        first = np.repeat(np.arange(len(by_value)), partners)
+        run_starts = np.repeat(np.cumsum(partners) - partners, partners)
+        second = first + 1 + np.arange(len(first)) - run_starts
+        first, second = by_value[first], by_value[second]
+
+        report = np.empty(len(first), dtype=[("signal_a", np.intp), ("index_a", np.intp), ("signal_b", np.intp), ("index_b", np.intp), ("value", values.dtype)])
+        report["signal_a"], report["signal_b"] = signal_ids[first], signal_ids[second]
+        report["index_a"] = first - self.offsets[signal_ids[first]]
+        report["index_b"] = second - self.offsets[signal_ids[second]]
+        report["value"] = values[first]
+        return report[np.lexsort((report["signal_b"], report["index_a"], report["signal_a"]))]
+
+    # Introduces duplicates into every signal of the set with one vectorized call, see Signal.introduce_duplicates()
+    # Returns the ground truth: one row per modified sample with the signal, the index and the index of the copied value
+    def introduce_duplicates(self, duplicate_chance, axis="y", rng=None):
+        if duplicate_chance < 0 or duplicate_chance > 1:
+            raise ValueError("Invalid duplicate_chance argument. Allowed values are between '0' and '1'.")
+        rng = np.random.default_rng(rng)
+        values = self.data[Signal._axis_index(axis)]
+        sizes = np.diff(self.offsets)
+        signal_ids = self._signal_ids()
+
+        # Random sample without replacement inside each signal: the samples with the smallest random keys
+        order = np.lexsort((rng.random(len(values)), signal_ids))
+        rank = np.arange(len(values)) - np.repeat(self.offsets[:-1], sizes)
+        chosen = np.sort(order[rank < np.repeat((sizes * duplicate_chance).astype(np.int64), sizes)])
+
+        # Copied values come from any sample of the same signal
+        chosen_ids = signal_ids[chosen]
+        sources = self.offsets[chosen_ids] + (rng.random(len(chosen)) * sizes[chosen_ids]).astype(np.int64)
+        values[chosen] = values[sources]
+
+        report = np.empty(len(chosen), dtype=[("signal", np.intp), ("index", np.intp), ("source", np.intp)])
+        report["signal"] = chosen_ids
+        report["index"] = chosen - self.offsets[chosen_ids]
+        report["source"] = sources - self.offsets[chosen_ids]
+        return report
+
+    def _signal_ids(self):
+        # Signal of every column of the storage
+        return np.repeat(np.arange(len(self)), np.diff(self.offsets))
+
+    def _value_groups(self, values):
+        # Groups of equal values inside each signal. Returns the start and size of each group in the sorted order,
+        # and the sorted order. np.lexsort is stable, so the first element of a group is the first occurrence
+        signal_ids = self._signal_ids()
+        order = np.lexsort((values, signal_ids))
+        sorted_values, sorted_ids = values[order], signal_ids[order]
+        new_group = np.ones(len(order), dtype=bool)
+        new_group[1:] = (sorted_values[1:] != sorted_values[:-1]) | (sorted_ids[1:] != sorted_ids[:-1])
+        starts = np.flatnonzero(new_group)
+        return starts, np.diff(np.append(starts, len(order))), order
+
+
 if __name__ == "__main__":
+    from astropy import units as u  # Only the examples use units
+
     # Parameters
     size = 100
     time_array = np.arange(0, size) * 1e-3
@@ -120,105 +504,8 @@ if __name__ == "__main__":
     intersections = Stripline_BPM.signal_intersections(Button_BPM, "y")  # Compare y axis i.e. Voltage
     print("\n\nStripline and Button identical Voltages: ", intersections)
 
-    ########################
-    ########################
-    ########################
-    # Visualization Example 1
-    ########################
-    ########################
-    ########################
-
-    fig, ax = plt.subplots(2, 1)
-
-    ax[0].plot(ADC.signal[0], ADC.signal[1], c='blue', label=ADC.signal_type)
-    ax[0].set_xlabel(str(list(ADC.units)[0]))
-    ax[0].set_ylabel(str(list(ADC.units)[1]))
-    ax[0].set_title(ADC.signal_type)
-
-    ax[1].plot(ADC.signal[0], ADC.signal[1], c='blue', label=ADC.signal_type)
-    ax[1].set_xlabel(str(list(ADC.units)[0]))
-    ax[1].set_ylabel(str(list(ADC.units)[1]))
-
-    adc_duplicates = ADC._detect_duplicates()
-
-    for time, voltage in zip(ADC.signal[0], ADC.signal[1]):
-        if voltage in adc_duplicates:
-            ax[1].scatter(time, voltage, c='red')
-
-    # To avoid adding many labels
-    if adc_duplicates:
-        ax[1].scatter([], [], c='red', label='Duplicates')
-
-    ax[0].legend(loc='lower right')
-    ax[1].legend(loc='lower right')
-    ax[0].grid()
-    ax[1].grid()
-    plt.show()
-
-    ########################
-    ########################
-    ########################
-    # Visualization Example 2
-    ########################
-    ########################
-    ########################
-
-    fig, ax = plt.subplots(3, 1)
-
-    # Plot Stripline_BPM signal, Button_BPM signal, and both signals,  on separate subplots
-    ax[0].plot(Stripline_BPM.signal[0], Stripline_BPM.signal[1], c='blue', label='Stripline_BPM')
-    ax[1].plot(Button_BPM.signal[0], Button_BPM.signal[1], c='red', label='Button_BPM')
-
-    ax[2].plot(Stripline_BPM.signal[0], Stripline_BPM.signal[1], c='blue', label='Stripline_BPM')
-    ax[2].plot(Button_BPM.signal[0], Button_BPM.signal[1], c='red', label='Button_BPM')
-
-    # Set labels
-    ax[0].set_xlabel(str(list(Stripline_BPM.units)[0]))
-    ax[1].set_xlabel(str(list(Button_BPM.units)[0]))
-    ax[2].set_xlabel(str(list(Button_BPM.units)[0]))
-    ax[0].set_ylabel(str(list(Stripline_BPM.units)[1]))
-    ax[1].set_ylabel(str(list(Button_BPM.units)[1]))
-    ax[2].set_ylabel(str(list(Button_BPM.units)[1]))
-
-    # Set limits
-    x_min = min(min(Stripline_BPM.signal[0]), min(Button_BPM.signal[0]))
-    x_max = max(max(Stripline_BPM.signal[0]), max(Button_BPM.signal[0]))
-    y_min = min(min(Stripline_BPM.signal[1]), min(Button_BPM.signal[1]))
-    y_max = max(max(Stripline_BPM.signal[1]), max(Button_BPM.signal[1]))
-    ax[0].set_xlim([x_min, x_max])
-    ax[1].set_xlim([x_min, x_max])
-    ax[2].set_xlim([x_min, x_max])
-    ax[0].set_ylim([y_min, y_max])
-    ax[1].set_ylim([y_min, y_max])
-    ax[2].set_ylim([y_min, y_max])
-
-    # Set ticks
-    x_ticks = np.linspace(x_min, x_max, 5)
-    y_ticks = np.linspace(y_min, y_max, 5)
-    ax[0].set_xticks(x_ticks)
-    ax[1].set_xticks(x_ticks)
-    ax[2].set_xticks(x_ticks)
-    ax[0].set_yticks(y_ticks)
-    ax[1].set_yticks(y_ticks)
-    ax[2].set_yticks(y_ticks)
-
-    # Set titles and legends
-    ax[0].set_title('Stripline_BPM Signal')
-    ax[1].set_title('Button_BPM Signal')
-    ax[2].set_title('Signal intersections')
-
-    for time, voltage in zip(Button_BPM.signal[0], Button_BPM.signal[1]):
-
-        if voltage in intersections:
-            ax[2].scatter(time, voltage, c='red', label='Intersections')
-
-    for item in intersections:
-        print(item in Stripline_BPM.signal[1])
-        print(item in Button_BPM.signal[1])
-
-    # Show the plot
-    ax[0].grid(True)
-    ax[1].grid(True)
-    ax[2].grid(True)
-    plt.tight_layout()
-    plt.show()
+    # Visualization, requires matplotlib
+    from visualization import plot_duplicates, plot_intersections
+
+    plot_duplicates(ADC)
+    plot_intersections(Stripline_BPM, Button_BPM, intersections, labels=('Stripline_BPM', 'Button_BPM'))
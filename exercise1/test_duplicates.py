@@ -1,9 +1,18 @@
 import pytest
+import os
 import random
+import subprocess
+import sys
 import numpy as np
 from collections import Counter  # Just for testing!
-from detect_duplicates import detect_duplicates, detect_duplicates_unsorted, detect_duplicates_sorted
+from detect_duplicates import detect_duplicates, detect_duplicates_unsorted, detect_duplicates_sorted, detect_duplicates_hashed, DuplicateDetector, detect_duplicates_parallel
+from array_duplicates import detect_duplicates_array, detect_duplicates_sorted_array, detect_duplicates_array_approximate, detect_duplicates_array_parallel, intersect_arrays
+from array_duplicates import cluster_near_duplicates, intersect_arrays_tolerance
+from array_duplicates import detect_duplicates_array_chunked, intersect_arrays_chunked, first_occurrence_mask_chunked, first_occurrence_mask
 from utils.classes import Proton, Date
+from utils.functions import is_sorted
+from utils.cache import ResultCache, content_digest
+from utils import instrumentation
 
 
 sputnik_space = Date(1957, 10, 4)
@@ -47,6 +56,365 @@ def test_detect_duplicates_sorted(input_list, expected_duplicates):
     assert duplicates1 == duplicates2 == expected_duplicates
 
 
+@pytest.mark.parametrize("input_list, expected_duplicates", [
+    ([[1, [2, 3]], (1, [2, 3]), [1, [2, 3]], (1, [2, 3])], [[1, [2, 3]], (1, [2, 3])]),
+    ([{"a": [1]}, {"a": 1}, {"a": [1]}, {1, 2}, frozenset({2, 1})], [{"a": [1]}, {1, 2}]),
+    ([[1, 2], (1, 2), [1.0, 2], bytearray(b"ab"), b"ab"], [[1, 2], bytearray(b"ab")]),
+    ([[True], [1], [False], (0,), [0]], [[True], [False]]),
+])
+# Test unhashable elements using detect_duplicates_hashed(). Also, compare using detect_duplicates_unsorted()
+def test_detect_duplicates_hashed(input_list, expected_duplicates):
+    duplicates1 = detect_duplicates_hashed(input_list)
+    duplicates2 = detect_duplicates_unsorted(input_list)
+    assert duplicates1 == duplicates2 == expected_duplicates
+
+
+# Opaque objects (unhashable, not containers) fall back to the equality scan and keep their order
+def test_detect_duplicates_hashed_opaque():
+    class Opaque:
+        __hash__ = None
+
+        def __init__(self, value):
+            self.value = value
+
+        def __eq__(self, other):
+            return isinstance(other, Opaque) and self.value == other.value
+
+    first, second = Opaque(1), Opaque(2)
+    input_list = [second, "a", first, Opaque(2), "a", Opaque(1)]
+    assert detect_duplicates_hashed(input_list) == detect_duplicates_unsorted(input_list) == [second, "a", first]
+
+
+# Streaming detection in chunks gives the same result as detect_duplicates() on the whole list
+@pytest.mark.parametrize("chunk_size", [1, 3, 100])
+def test_duplicate_detector(chunk_size):
+    input_list = [titanic_sinks, 1, [1, 2], "8", proton1, True, swiss_cheese_birth, [1, 2], proton3, "9", "8", 1]
+    detector = DuplicateDetector()
+    found = []
+    for start in range(0, len(input_list), chunk_size):
+        found.extend(detector.feed(iter(input_list[start:start + chunk_size])))
+
+    expected = detect_duplicates(input_list)
+    assert detector.result() == expected
+    assert len(detector) == len(input_list)
+    # Each duplicate is yielded once, when its second occurrence is seen
+    assert found == [1, titanic_sinks, [1, 2], proton1, "8"]
+
+
+def test_duplicate_detector_add_update():
+    detector = DuplicateDetector()
+    assert [detector.add(item) for item in ["a", "b", "a", "a"]] == [False, False, True, False]
+    assert detector.update(["c", "b", "c"]) == ["b", "c"]
+    assert detector.result() == ["a", "b", "c"]
+
+
+@pytest.mark.parametrize("input_array", [
+    np.array([0.3, -1.5, 0.3, 2.0, 7.1, -1.5, 0.3, 7.1]),
+    np.array([5, 4, 4, 3, 1, 1, 1]),
+    np.array([1.0, 2.0, 3.0]),
+    np.array([], dtype=np.float64),
+    np.random.default_rng(7).integers(0, 50, 500),
+])
+# Test numeric arrays using detect_duplicates_array(). Compare with detect_duplicates() on the equivalent list
+def test_detect_duplicates_array(input_array):
+    duplicates = detect_duplicates_array(input_array)
+    assert isinstance(duplicates, np.ndarray)
+    assert duplicates.tolist() == detect_duplicates(input_array.tolist())
+
+
+@pytest.mark.parametrize("input_list, expected", [
+    ([], True),
+    ([3], True),
+    ([1, 2, 2, 5], True),
+    (["z", "y", "y", "a"], True),
+    ([1, 3, 2], False),
+    ([1, "a", 2], False),
+    ([{"a": 1}, {"a": 2}], False),  # dicts cannot be ordered
+])
+def test_is_sorted(input_list, expected):
+    assert is_sorted(input_list) == expected
+
+
+# The sortedness hint skips the check, both engines give the same result on a sorted list
+@pytest.mark.parametrize("sorted_hint", [None, True, False])
+def test_sorted_hint(sorted_hint):
+    assert detect_duplicates([1, 1, 2, 3, 3, 3], sorted_hint=sorted_hint) == [1, 3]
+    assert detect_duplicates_array(np.array([9.0, 7.5, 7.5, 1.0, 1.0]), sorted_hint=sorted_hint).tolist() == [7.5, 1.0]
+
+
+def test_detect_duplicates_sorted_array():
+    sorted_array = np.sort(np.random.default_rng(3).integers(0, 40, 300))
+    assert detect_duplicates_sorted_array(sorted_array).tolist() == detect_duplicates_sorted(sorted_array.tolist())
+
+
+# NaN is never equal to NaN, in the list engines and in every array engine
+@pytest.mark.parametrize("input_array, expected", [
+    (np.array([np.nan, np.nan]), []),
+    (np.array([1.0, np.nan, 2.0, np.nan, 1.0]), [1.0]),
+    (np.array([1.0, 1.0, np.nan, np.nan]), [1.0]),
+])
+def test_nan_duplicates(input_array, expected):
+    assert detect_duplicates(input_array.tolist()) == expected
+    assert detect_duplicates_array(input_array).tolist() == expected
+    assert detect_duplicates_array(input_array, sorted_hint=False).tolist() == expected
+    assert detect_duplicates_sorted_array(np.sort(input_array)).tolist() == expected
+    assert detect_duplicates_array_approximate(input_array, chunk_size=2).tolist() == expected
+    assert detect_duplicates_array_chunked(input_array, chunk_size=2).tolist() == expected
+
+
+# The approximate engine rejects the false positives of the filter, so the output is the same as the exact engine
+@pytest.mark.parametrize("max_bytes", [1, 64, None])
+def test_detect_duplicates_approximate(max_bytes, generate_random_list):
+    input_list = generate_random_list + [[1, 2], {"a": 1}, [1, 2], None, None]
+    report = {}
+    duplicates = detect_duplicates(input_list, approximate=True, max_bytes=max_bytes, report=report)
+    assert duplicates == detect_duplicates(input_list)
+    assert report["rejected"] == report["candidates"] - len(duplicates)
+    if max_bytes is not None:
+        assert report["filter_bytes"] <= max_bytes
+
+
+@pytest.mark.parametrize("max_bytes, chunk_size", [(1, 7), (64, 50), (None, 1 << 16)])
+def test_detect_duplicates_array_approximate(max_bytes, chunk_size):
+    input_array = np.random.default_rng(5).integers(-300, 300, 1000) / 4
+    input_array[10] = -0.0  # Equal to 0.0
+    report = {}
+    duplicates = detect_duplicates_array_approximate(input_array, max_bytes=max_bytes, chunk_size=chunk_size, report=report)
+    assert np.array_equal(duplicates, detect_duplicates_array(input_array))
+    assert report["memory_bytes"] >= report["filter_bytes"]
+
+
+# The chunk maps of the worker processes are merged into the same order-preserving result as the serial engine
+@pytest.mark.parametrize("chunk_size", [None, 4])
+def test_detect_duplicates_parallel(chunk_size, generate_random_list):
+    input_list = generate_random_list + [[1, 2], titanic_sinks, {"a": 1}, [1, 2], swiss_cheese_birth, {"a": 1}]
+    assert detect_duplicates_parallel(input_list, workers=2, chunk_size=chunk_size) == detect_duplicates(input_list)
+    assert detect_duplicates(input_list, workers=2) == detect_duplicates(input_list)
+    assert detect_duplicates_parallel([], workers=2) == []
+
+
+# Objects hashed by identity are copies in the workers, they must still match across chunks
+def test_detect_duplicates_parallel_identity():
+    a, b = IdentityHashed(), IdentityHashed()
+    input_list = [a, b, 1, 2, a, b]
+    duplicates = detect_duplicates_parallel(input_list, workers=2)
+    assert duplicates == detect_duplicates(input_list) == [a, b]
+    assert duplicates[0] is a and duplicates[1] is b
+
+
+# Lists that cannot be sent to the workers are checked by the serial engine
+def test_detect_duplicates_parallel_unpicklable():
+    func = lambda x: x  # noqa: E731
+    input_list = [func, 1, func, 2, 1]
+    assert detect_duplicates_parallel(input_list, workers=2) == detect_duplicates(input_list) == [func, 1]
+
+
+class IdentityHashed:
+    pass
+
+
+def test_detect_duplicates_array_parallel():
+    input_array = np.random.default_rng(11).integers(0, 400, 2000) * 0.5
+    duplicates = detect_duplicates_array_parallel(input_array, workers=3, chunk_size=256)
+    assert np.array_equal(duplicates, detect_duplicates_array(input_array))
+
+
+@pytest.mark.parametrize("assume_unique", [False, True])
+def test_intersect_arrays(assume_unique):
+    first = np.array([0.5, 9.0, 3.25, -1.0, 7.0])
+    second = np.array([7.0, 2.0, 0.5, 3.25, 8.0])
+    values, first_indices, second_indices = intersect_arrays(first, second, assume_unique)
+    # Same values and order as detect_duplicates() on the concatenated lists
+    assert values.tolist() == detect_duplicates(first.tolist() + second.tolist()) == [0.5, 3.25, 7.0]
+    assert np.array_equal(first[first_indices], values) and np.array_equal(second[second_indices], values)
+
+
+def test_cluster_near_duplicates():
+    input_array = np.array([1.0, 5.0, 1.0 + 1e-9, 3.0, 5.0 - 2e-9, 9.0, 1.0, 100.0, 100.5])
+    clusters = cluster_near_duplicates(input_array, atol=1e-8)
+    assert [cluster.tolist() for cluster in clusters] == [[0, 2, 6], [1, 4]]
+    # Relative tolerance: 0.5 is within 1% of 100
+    clusters = cluster_near_duplicates(input_array, rtol=0.01)
+    assert [cluster.tolist() for cluster in clusters] == [[0, 2, 6], [1, 4], [7, 8]]
+    # Zero tolerance gives the exact duplicates
+    assert [input_array[cluster[0]] for cluster in cluster_near_duplicates(input_array)] == detect_duplicates(input_array.tolist())
+
+
+def test_intersect_arrays_tolerance():
+    first = np.array([0.1 + 0.2, 7.0, 2.5, 4.0])
+    second = np.array([4.0 + 1e-12, 0.3, 9.0])
+    first_indices, second_indices = intersect_arrays_tolerance(first, second, atol=1e-9)
+    assert first_indices.tolist() == [0, 3] and second_indices.tolist() == [1, 0]
+    assert intersect_arrays_tolerance(first, second)[0].tolist() == []  # 0.1 + 0.2 != 0.3
+
+
+# Out-of-core engines over a memory-mapped file give the same results as the in-memory engines
+def test_chunked_memmap(tmp_path):
+    rng = np.random.default_rng(13)
+    first = np.memmap(tmp_path / "first.bin", dtype=np.float64, mode="w+", shape=(5000,))
+    first[:] = rng.integers(0, 3000, 5000) * 0.25
+    second = rng.integers(0, 3000, 4000) * 0.25
+
+    assert np.array_equal(detect_duplicates_array_chunked(first, chunk_size=600, temp_dir=tmp_path), detect_duplicates_array(np.array(first)))
+    for chunked, in_memory in zip(intersect_arrays_chunked(first, second, chunk_size=600), intersect_arrays(np.array(first), second)):
+        assert np.array_equal(chunked, in_memory)
+
+    mask = first_occurrence_mask_chunked([first], chunk_size=600)
+    assert np.array_equal(np.flatnonzero(mask), np.sort(np.unique(first, return_index=True)[1]))
+
+
+def test_first_occurrence_mask_pairs():
+    x = np.array([1, 1, 2, 2, 1, 1, 3, 3, 1, 1.0])
+    y = np.array([5, 5, 5, 6, 6, 5, 5, 5, 5, 6.0])
+    assert np.flatnonzero(first_occurrence_mask_chunked([x, y], chunk_size=3)).tolist() == [0, 2, 3, 4, 6]
+
+
+# Same NaN rule as the detection engines: NaN values are never duplicates, so every NaN is kept
+def test_first_occurrence_mask_nan():
+    x = np.array([np.nan, 1.0, np.nan, 1.0, 2.0, np.nan])
+    y = np.array([0.0, 0.0, 0.0, 0.0, 0.0, 1.0])
+    assert np.flatnonzero(first_occurrence_mask([x])).tolist() == [0, 1, 2, 4, 5]
+    assert np.flatnonzero(first_occurrence_mask_chunked([x], chunk_size=2)).tolist() == [0, 1, 2, 4, 5]
+    assert np.flatnonzero(first_occurrence_mask_chunked([x, y], chunk_size=2)).tolist() == [0, 1, 2, 4, 5]
+    assert detect_duplicates_array(x[first_occurrence_mask([x])]).tolist() == []
+
+
+def test_result_cache(tmp_path):
+    cache = ResultCache(max_entries=2, directory=tmp_path)
+    input_list = ["b", "a", (1, 2), "a", 2.5, None, 2.5, (1, 2)]
+    assert detect_duplicates(input_list, cache=cache) == ["a", (1, 2), 2.5]
+    assert detect_duplicates(list(input_list), cache=cache) == ["a", (1, 2), 2.5]
+    assert cache.stats["misses"] == 1 and cache.stats["memory_hits"] == 1
+
+    # A new process only has the disk tier
+    cold = ResultCache(max_entries=2, directory=tmp_path)
+    assert detect_duplicates(input_list, cache=cold) == ["a", (1, 2), 2.5]
+    assert cold.stats["disk_hits"] == 1
+
+    # Different content, different key. Arrays are keyed by dtype, shape and buffer
+    assert content_digest([1, 2]) != content_digest([1, 2.0])
+    assert content_digest(np.arange(8)[::2]) == content_digest(np.array([0, 2, 4, 6]))
+    assert content_digest(np.arange(4)) != content_digest(np.arange(4).reshape(2, 2))
+
+    # Least recently used entries are evicted from memory, and from disk above max_bytes
+    for i in range(3):
+        cache.put(f"key{i}", [i])
+    assert len(cache) == 2
+    assert cache.get("key0") == [0] and cache.stats["disk_hits"] == 1  # Evicted from memory, still on disk
+    small = ResultCache(directory=tmp_path / "small", max_bytes=1)
+    small.put("key", list(range(100)))
+    assert not list((tmp_path / "small").iterdir())
+
+
+# Calls with a report bypass the cache, the report is filled on every call
+def test_result_cache_report():
+    cache = ResultCache()
+    input_list = [3, 1, 3, 2, 1]
+    assert detect_duplicates(input_list, cache=cache) == [3, 1]
+    report = {}
+    assert detect_duplicates(input_list, approximate=True, report=report, cache=cache) == [3, 1]
+    assert report["candidates"] >= 2 and report["rejected"] == report["candidates"] - 2
+    assert cache.stats["memory_hits"] == 0
+
+
+# Only lists of plain values are cached: NaN is not equal to itself, and objects may be compared by identity,
+# so lists with the same pickled content may have different duplicates
+def test_result_cache_plain_values(tmp_path):
+    cache = ResultCache(directory=tmp_path)
+    nan = float("nan")
+    assert detect_duplicates([nan, nan], cache=cache) == [nan]
+    assert detect_duplicates([float("nan"), float("nan")], cache=cache) == []
+
+    class Token:  # Compared by identity
+        pass
+
+    first, second = Token(), Token()
+    assert detect_duplicates([first, first], cache=cache) == [first]
+    assert detect_duplicates([second, second], cache=cache) == [second]
+    assert detect_duplicates([titanic_sinks, swiss_cheese_birth], cache=cache) == [titanic_sinks]
+    assert detect_duplicates([[1, 2], [1, 2]], cache=cache) == [[1, 2]]
+    assert cache.stats["misses"] == 0 and len(cache) == 0 and not list(tmp_path.iterdir())
+    with pytest.raises(TypeError):
+        content_digest([(1, nan)])
+    assert content_digest([(1, 2), frozenset({"a"}), b"x", 1j, True, None])
+
+
+# Files removed by another process sharing the directory are skipped, during the eviction and when reading
+def test_result_cache_concurrent_eviction(tmp_path, monkeypatch):
+    cache = ResultCache(directory=tmp_path, max_bytes=1)
+    remove = os.remove
+
+    def remove_twice(path):
+        remove(path)  # Another process removes the file first
+        remove(path)
+
+    monkeypatch.setattr(os, "remove", remove_twice)
+    cache.put("key", list(range(100)))
+    assert not list(tmp_path.iterdir()) and cache.stats["evictions"] == 0
+
+    monkeypatch.undo()
+    ResultCache(directory=tmp_path).put("key", [1, 2])
+
+    def utime(path):
+        raise FileNotFoundError(path)  # Another process removes the file after it is read
+
+    monkeypatch.setattr(os, "utime", utime)
+    assert ResultCache(directory=tmp_path).get("key") == [1, 2]
+
+
+def test_instrumentation(tmp_path):
+    metrics = instrumentation.add_listener(instrumentation.MetricsRegistry())
+    try:
+        detect_duplicates([1, 2, 2, 3])
+        detect_duplicates([3, 1, 3])
+        detect_duplicates([3, 1, 3], approximate=True)
+        cache = ResultCache(directory=tmp_path)
+        detect_duplicates([3, 1, 3], cache=cache)
+        detect_duplicates([3, 1, 3], cache=cache)
+    finally:
+        instrumentation.remove_listener(metrics)
+    summary = metrics.snapshot()["detect_duplicates"]
+    assert summary["calls"] == 5 and summary["elements"] == 16 and summary["duplicates"] == 5
+    assert summary["engines"] == {"sorted": 1, "hashed": 2, "approximate": 1, "cache": 1}
+    assert summary["is_sorted_seconds"] <= summary["seconds"]
+
+    # Per-call profiling, without listeners
+    events = []
+    assert detect_duplicates(["a", "b", "a"], profile=events.append) == ["a"]
+    assert events[0]["allocated_bytes"] >= 0 and events[0]["profile"].total_calls > 0
+    detect_duplicates([1])
+    assert len(events) == 1
+
+
+# Import budget of the core detection API, measured in a new interpreter: modules loaded, and import time reported by
+# python -X importtime (cumulative time of the imports only, without the interpreter startup). The bound is generous for loaded CI machines
+def test_import_budget():
+    heavy = ("numpy", "matplotlib", "astropy", "concurrent.futures", "cProfile")
+    code = "import sys; import {}; " f"print([module for module in {heavy!r} if module in sys.modules])"
+    run = subprocess.run([sys.executable, "-X", "importtime", "-c", code.format("detect_duplicates, main")],
+                         cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True)
+    assert run.stdout.strip() == "[]"
+    cumulative = {}  # Top-level imports: module -> microseconds, including the modules they import
+    for line in run.stderr.splitlines():
+        if line.startswith("import time:") and not line.endswith("imported package"):
+            _, microseconds, module = line.split("|")
+            if not module.startswith("  "):
+                cumulative[module.strip()] = int(microseconds)
+    assert cumulative["detect_duplicates"] + cumulative["main"] < 500_000
+
+    # Signals need numpy, plotting and units are only loaded by the examples
+    run = subprocess.run([sys.executable, "-c", code.format("signals")], cwd=os.path.dirname(os.path.abspath(__file__)),
+                         capture_output=True, text=True, check=True)
+    assert run.stdout.strip() == "['numpy']"
+
+
+def test_invalid_array():
+    with pytest.raises(TypeError):
+        detect_duplicates_array([1, 2, 2])
+    with pytest.raises(ValueError):
+        detect_duplicates_array(np.zeros((2, 3)))
+
+
 # Expected fails
 # TypeError is expected for string inputs
 def test_invalid_list():
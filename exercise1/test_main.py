@@ -0,0 +1,68 @@
+import io
+import json
+import numpy as np
+import pytest
+from main import main, write_items
+
+
+def test_write_items(tmp_path):
+    path = tmp_path / "out.txt"
+    with open(path, 'w') as file:
+        assert write_items(iter(range(10)), file, batch_size=3) == 10
+    assert path.read_text().splitlines() == [str(i) for i in range(10)]
+
+
+def test_cli_single_input(tmp_path, capsys):
+    lines = tmp_path / "values.txt"
+    lines.write_text("b\na\nc\na\nb\na\n")
+    output = tmp_path / "duplicates.txt"
+    main([str(lines), "-o", str(output), "--timing"])
+    assert output.read_text().splitlines() == ["b", "a"]  # In the order of their first occurrence
+    assert "6 elements, 2 duplicates" in capsys.readouterr().err
+
+    # Lines evaluated as Python literals, to the standard output
+    lines.write_text("1\n[1, 2]\n'1'\n[1, 2]\n1\n")
+    main([str(lines), "--literal"])
+    assert capsys.readouterr().out.splitlines() == ["1", "[1, 2]"]
+
+
+def test_cli_many_inputs(tmp_path):
+    (tmp_path / "values.json").write_text(json.dumps([1, [2], {"a": 1}, [2], {"a": 1}]))
+    np.save(tmp_path / "values.npy", np.array([3.0, 1.0, 3.0, 2.0, 1.0]))
+    output = tmp_path / "out"
+    main([str(tmp_path / "values.json"), str(tmp_path / "values.npy"), "-o", str(output)])
+    assert (output / "values.json.duplicates.txt").read_text().splitlines() == ["[2]", "{'a': 1}"]
+    assert (output / "values.npy.duplicates.txt").read_text().splitlines() == ["3.0", "1.0"]
+
+
+# An input that cannot be read is reported, the next inputs are still checked and the exit status is 1
+def test_cli_errors(tmp_path, capsys):
+    (tmp_path / "empty_line.txt").write_text("1\n\n1\n")
+    (tmp_path / "values.txt").write_text("2\n2\n")
+    output = tmp_path / "out"
+    inputs = [str(tmp_path / "missing.txt"), str(tmp_path / "empty_line.txt"), str(tmp_path / "values.txt")]
+    assert main(inputs + ["-o", str(output), "--literal"]) == 1
+    err = capsys.readouterr().err
+    assert "missing.txt: error:" in err and "empty_line.txt: error: line 2: invalid literal ''" in err
+    assert sorted(path.name for path in output.iterdir()) == ["values.txt.duplicates.txt"]  # No partial results
+    assert (output / "values.txt.duplicates.txt").read_text().splitlines() == ["2"]
+    assert main([str(tmp_path / "values.txt")]) == 0
+
+
+# Inputs with the same file name would write the same output file
+def test_cli_output_collision(tmp_path):
+    for directory in ("a", "b"):
+        (tmp_path / directory).mkdir()
+        (tmp_path / directory / "values.txt").write_text("1\n")
+    with pytest.raises(SystemExit):
+        main([str(tmp_path / "a" / "values.txt"), str(tmp_path / "b" / "values.txt"), "-o", str(tmp_path / "out")])
+    assert not (tmp_path / "out").exists()
+
+
+# The standard input is read, not closed
+def test_cli_stdin(monkeypatch, capsys):
+    stdin = io.StringIO(json.dumps(["x", "y", "y"]))
+    monkeypatch.setattr("sys.stdin", stdin)
+    assert main(["-", "--format", "json"]) == 0
+    assert capsys.readouterr().out.splitlines() == ["y"]
+    assert not stdin.closed
@@ -0,0 +1,187 @@
+import pytest
+import numpy as np
+from signals import Signal, SignalSet
+from utils.cache import ResultCache
+
+
+time_array = np.arange(10) * 1e-3
+voltages = np.array([0.5, 0.2, 0.5, 0.9, 0.2, 0.1, 0.7, 0.5, 0.3, 0.8])
+
+
+@pytest.fixture
+def adc():
+    return Signal("ADC", np.array((time_array, voltages)), axis="y")
+
+
+def test_detect_duplicates(adc):
+    assert adc._detect_duplicates() == [0.5, 0.2]
+    report = {}
+    assert adc._detect_duplicates(approximate=True, max_bytes=1, report=report) == [0.5, 0.2]
+    assert report["y"]["rejected"] == report["y"]["candidates"] - 2
+
+
+@pytest.mark.parametrize("inplace", [False, True])
+def test_remove_duplicates(adc, inplace):
+    original = adc.signal
+    keep = adc.remove_duplicates(axis="y", inplace=inplace)
+    assert np.flatnonzero(keep).tolist() == [0, 1, 3, 5, 6, 8, 9]
+    assert adc.signal[1].tolist() == [0.5, 0.2, 0.9, 0.1, 0.7, 0.3, 0.8]
+    assert np.array_equal(adc.signal[0], time_array[keep])
+    assert adc._detect_duplicates() == []
+    # In place, the signal is a view of the original buffer. Otherwise the original is unchanged
+    assert np.shares_memory(adc.signal, original) == inplace
+    assert np.array_equal(original[1], voltages) != inplace
+
+
+def test_remove_duplicates_both():
+    signal = Signal("ADC", np.array(([1.0, 1.0, 2.0, 1.0], [5.0, 6.0, 5.0, 5.0])), axis="both")
+    assert signal.remove_duplicates(axis="both").tolist() == [True, True, True, False]
+    with pytest.raises(ValueError):
+        signal.remove_duplicates(axis="z")
+
+
+def test_signal_intersections(adc):
+    stripline = Signal("ADC", np.array((time_array[:4], [0.8, 0.35, 0.1, 0.05])))
+    with pytest.raises(ValueError):  # adc has anomalies
+        adc.signal_intersections(stripline, "y")
+
+    adc.remove_duplicates(axis="y")
+    values, indices, other_indices = adc.signal_intersections(stripline, "y", return_indices=True)
+    assert values == [0.1, 0.8]
+    assert indices.tolist() == [3, 6] and other_indices.tolist() == [2, 0]
+
+    shifted = Signal("ADC", np.array((time_array[:2], [0.1 + 1e-12, 0.3 - 1e-12])))
+    assert adc.signal_intersections(shifted, "y") == []
+    assert adc.signal_intersections(shifted, "y", atol=1e-9) == [0.1, 0.3]
+    with pytest.raises(ValueError):
+        adc.signal_intersections(Signal("BPM", shifted.signal), "y")
+
+
+def test_near_duplicates():
+    signal = Signal("ADC", np.array((time_array[:5], [1.0, 2.0, 1.0 + 1e-10, 3.0, 2.0 - 1e-10])))
+    assert [cluster.tolist() for cluster in signal.near_duplicates("y", atol=1e-9)] == [[0, 2], [1, 4]]
+
+
+# Cached verdicts are cleared when the signal changes
+def test_cached_verdicts(adc):
+    assert not adc._is_duplicate_free(1)
+    adc.signal = np.array((time_array, np.arange(10.0)))
+    assert adc._is_duplicate_free(1)
+
+
+def test_from_file(tmp_path):
+    path = tmp_path / "capture.bin"
+    rng = np.random.default_rng(2)
+    data = np.array((np.arange(3000) * 1e-3, rng.integers(0, 2000, 3000) * 0.5))
+    data.tofile(path)
+
+    in_memory = Signal("ADC", data.copy())
+    mapped = Signal.from_file(path, mode="r+", chunk_size=400)
+    assert isinstance(mapped.signal, np.memmap) and mapped.signal_type == "capture"
+    assert mapped._detect_duplicates() == in_memory._detect_duplicates()
+
+    # Without inplace, the kept samples go to a new file and the capture is left unchanged
+    before = mapped.signal
+    keep = mapped.remove_duplicates(axis="y")
+    assert np.array_equal(keep, in_memory.remove_duplicates(axis="y"))
+    assert np.array_equal(mapped.signal, in_memory.signal) and isinstance(mapped.signal, np.memmap)
+    assert np.array_equal(np.fromfile(path), data.ravel()) and np.array_equal(before, data)
+
+    output = tmp_path / "kept.bin"
+    Signal.from_file(path, mode="r", chunk_size=400).remove_duplicates(axis="y", path=output)
+    assert np.array_equal(Signal.from_file(output).signal, in_memory.signal)
+    with pytest.raises(ValueError):  # The capture cannot be the output of its own copy
+        Signal.from_file(path, mode="r", chunk_size=400).remove_duplicates(axis="y", path=path)
+
+    # In place, the file is rewritten with the compacted signal only, with no stale samples after it.
+    # Arrays that still map the old file keep their samples
+    rewritten = Signal.from_file(path, mode="r+", chunk_size=400)
+    before = rewritten.signal
+    rewritten.remove_duplicates(axis="y", inplace=True)
+    assert before[1, -1] == data[1, -1] and np.array_equal(before, data)
+    reopened = Signal.from_file(path, chunk_size=400)
+    assert np.array_equal(reopened.signal, in_memory.signal) and np.array_equal(rewritten.signal, in_memory.signal)
+    assert reopened._detect_duplicates() == []
+
+    with pytest.raises(ValueError):  # read-only file
+        Signal.from_file(path, mode="r", chunk_size=400).remove_duplicates(axis="y", inplace=True)
+
+
+def test_signal_set():
+    arrays = [
+        np.array((time_array[:5], [1.0, 2.0, 1.0, 3.0, 2.0])),
+        np.array((time_array[:3], [4.0, 3.0, 3.0])),
+        np.array((time_array[:4], [3.0, 9.0, 1.0, 1.0])),
+    ]
+    signal_set = SignalSet.from_signals([Signal("BPM", array) for array in arrays])
+    assert len(signal_set) == 3 and signal_set.data.shape == (2, 12)
+    assert np.array_equal(signal_set[-1].signal, arrays[2])
+
+    # Same duplicates as a loop over the Signal objects
+    report = signal_set.detect_duplicates(axis="y")
+    for i, array in enumerate(arrays):
+        assert report["value"][report["signal"] == i].tolist() == Signal("BPM", array)._detect_duplicates()
+    assert report.tolist() == [(0, 0, 1.0, 2), (0, 1, 2.0, 2), (1, 1, 3.0, 2), (2, 2, 1.0, 2)]
+
+    assert signal_set.intersections(axis="y").tolist() == [(0, 0, 2, 2, 1.0), (0, 3, 1, 1, 3.0), (0, 3, 2, 0, 3.0), (1, 1, 2, 0, 3.0)]
+    assert len(signal_set.intersections(axis="x")) == 3 + 3 + 4  # Time axes share their first samples
+
+    with pytest.raises(ValueError):
+        SignalSet.from_signals([Signal("BPM", arrays[0]), Signal("ADC", arrays[1])])
+
+
+def test_introduce_duplicates_lazy():
+    data = np.array((time_array, np.arange(10.0)))
+    signal = Signal("ADC", data, duplicate_chance=0.5, axis="both", rng=42)
+    assert np.array_equal(data[1], np.arange(10.0))  # Nothing is computed before the signal is read
+    assert signal.injected == {}
+
+    duplicates = signal._detect_duplicates()
+    assert set(signal.injected) == {"x", "y"} and len(signal.injected["y"]) == 5
+    # Only the injected indices were modified
+    unchanged = np.setdiff1d(np.arange(10), signal.injected["y"])
+    assert np.array_equal(data[1][unchanged], unchanged.astype(float))
+    assert duplicates  # The injected values are copies of existing values
+
+    # Same seed, same duplicates
+    again = Signal("ADC", np.array((time_array, np.arange(10.0))), duplicate_chance=0.5, axis="both", rng=42)
+    assert np.array_equal(again.signal, data)
+
+    assert Signal("ADC", np.array((time_array, np.arange(10.0)))).introduce_duplicates() == {}
+
+
+def test_signal_set_introduce_duplicates():
+    signal_set = SignalSet("BPM", [np.array((np.arange(n), np.arange(n) + 0.5)) for n in (10, 4, 7)])
+    truth = signal_set.introduce_duplicates(0.5, axis="y", rng=3)
+    assert np.bincount(truth["signal"]).tolist() == [5, 2, 3]
+    for i in range(len(signal_set)):
+        rows = truth[truth["signal"] == i]
+        assert len(np.unique(rows["index"])) == len(rows)  # Without replacement
+        values = signal_set[i].signal[1]
+        assert np.array_equal(values[rows["index"]], rows["source"] + 0.5)
+
+
+# Signals with the same data share the cached scan, and intersections reuse the duplicate-free verdict
+def test_signal_cache():
+    cache = ResultCache()
+    stripline = Signal("BPM", np.array((time_array, np.arange(10.0))))
+    button = Signal("BPM", np.array((time_array, np.arange(10.0))))
+    stripline.cache = button.cache = cache
+
+    assert stripline._detect_duplicates() == []
+    assert cache.stats == {"memory_hits": 0, "disk_hits": 0, "misses": 1, "evictions": 0}
+    assert stripline.signal_intersections(button, "y") == np.arange(10.0).tolist()
+    assert cache.stats["memory_hits"] == 1 and cache.stats["misses"] == 1
+
+    # Calls with a report bypass the cache, the report is filled for each axis
+    report = {}
+    assert button._detect_duplicates(approximate=True, report=report) == []
+    assert report["y"]["candidates"] == 0 and cache.stats["memory_hits"] == 1
+
+
+def test_instrumentation():
+    events = []
+    signal = Signal("ADC", np.array([[0, 1, 2, 3], [5, 6, 5, 5.0]]))
+    assert signal._detect_duplicates(profile=events.append) == [5.0]
+    assert events[0]["function"] == "Signal._detect_duplicates" and events[0]["engine"] == "array"
+    assert events[0]["elements"] == 4 and events[0]["duplicates"] == 1
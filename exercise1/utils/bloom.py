@@ -0,0 +1,59 @@
+import math
+
+MASK64 = (1 << 64) - 1
+
+
+def mix64(value):
+    # Function that spreads the bits of a 64-bit hash (splitmix64 finalizer)
+    # Python hashes of small integers are the integers themselves, which would give poor bit positions
+    value &= MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK64
+    return value ^ (value >> 31)
+
+
+def bloom_size(capacity, error_rate=0.01, max_bytes=None):
+    # Function that returns the number of bits and hash functions of a Bloom filter
+    # for the expected number of elements and false positive rate, limited to max_bytes of memory
+    if not 0 < error_rate < 1:
+        raise ValueError("Invalid error_rate argument. Allowed values are between '0' and '1'.")
+    capacity = max(capacity, 1)
+    num_bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+    if max_bytes is not None:
+        if max_bytes < 1:
+            raise ValueError("Invalid max_bytes argument. At least 1 byte is needed.")
+        num_bits = min(num_bits, max_bytes * 8)
+    num_bits = max(num_bits, 8)
+    num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+    return num_bits, num_hashes
+
+
+# Class for a compact probabilistic set. Membership tests have no false negatives,
+# and false positives with the probability chosen on creation
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.01, max_bytes=None):
+        self.num_bits, self.num_hashes = bloom_size(capacity, error_rate, max_bytes)
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    @property
+    def nbytes(self):
+        return len(self.bits)
+
+    # Adds the hash of an element. Returns True if it was (possibly) added before
+    def add(self, item_hash):
+        # Double hashing, the k bit positions are derived from the two halves of one 64-bit hash
+        item_hash = mix64(item_hash)
+        position = item_hash & 0xFFFFFFFF
+        step = (item_hash >> 32) | 1
+        bits, num_bits = self.bits, self.num_bits
+        present = True
+
+        for _ in range(self.num_hashes):
+            position %= num_bits
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not bits[byte] & mask:
+                present = False
+                bits[byte] |= mask
+            position += step
+
+        return present
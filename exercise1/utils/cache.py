@@ -0,0 +1,162 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+
+
+def content_digest(*values):
+    # Function that returns a digest of the content of the values
+    # Arrays (objects with a buffer, dtype and shape, e.g. ndarray) are hashed from their buffer without a copy when contiguous.
+    # Other values are pickled, they must be plain values or lists of plain values (see is_plain_value)
+    # Raises TypeError for other values, e.g., objects compared by identity, whose results cannot be shared between equal inputs
+    digest = hashlib.blake2b(digest_size=20)
+    for value in values:
+        if hasattr(value, "dtype") and hasattr(value, "flags"):
+            data = value if value.flags.c_contiguous else value.copy()
+            digest.update(f"array:{value.dtype.str}:{value.shape};".encode())
+            digest.update(memoryview(data).cast("B"))
+        else:
+            if not (is_plain_value(value) or isinstance(value, list) and all(map(is_plain_value, value))):
+                raise TypeError(f"Cannot build a digest for {type(value).__name__}: only plain values are digested")
+            data = pickle.dumps(value, protocol=4)
+            digest.update(f"pickle:{len(data)};".encode())
+            digest.update(data)
+    return digest.hexdigest()
+
+
+_PLAIN_TYPES = (type(None), bool, int, str, bytes)
+
+
+# Function that returns True for the values that are compared by value only, so equal values (and their unpickled copies)
+# are interchangeable: None, booleans, integers, strings, bytes, floats and complex numbers except NaN,
+# and tuples or frozensets of these. NaN is not equal to itself, and other objects may be compared by identity
+def is_plain_value(value):
+    kind = type(value)
+    if kind in _PLAIN_TYPES:
+        return True
+    if kind is float or kind is complex:
+        return value == value
+    if kind is tuple or kind is frozenset:
+        return all(map(is_plain_value, value))
+    return False
+
+
+# Class for a two-tier cache of results, keyed by content digests
+# Tier 1: in-process LRU with max_entries results. Tier 2 (optional): pickled results in a directory, at most max_bytes,
+# the least recently used files are evicted first. Hit and miss counts are kept in the stats attribute
+class ResultCache:
+    def __init__(self, max_entries=128, directory=None, max_bytes=256 * 2**20):
+        if max_entries < 1:
+            raise ValueError("Invalid max_entries argument. At least 1 entry is needed.")
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self):
+        return len(self._memory)
+
+    # Key of a result: a name for the computation, its parameters and the input data
+    @staticmethod
+    def key(name, data, **params):
+        return content_digest(name, sorted(params.items()), data)
+
+    # Returns the cached result or default. Results found on disk are promoted to memory
+    def get(self, key, default=None):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            return self._memory[key]
+
+        path = self._path(key)
+        if path is not None:
+            try:
+                with open(path, "rb") as file:
+                    value = pickle.load(file)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                pass
+            else:
+                try:
+                    os.utime(path)  # Recently used
+                except FileNotFoundError:  # Evicted meanwhile by another process, the value is still valid
+                    pass
+                self.stats["disk_hits"] += 1
+                self._remember(key, value)
+                return value
+
+        self.stats["misses"] += 1
+        return default
+
+    def put(self, key, value):
+        self._remember(key, value)
+        path = self._path(key)
+        if path is None:
+            return
+
+        # Write to a temporary file first, so readers never see a partial result
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(handle, "wb") as file:
+            pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)
+        self._evict_files()
+
+    # Returns the cached result of compute(data), computing and storing it on a miss
+    # Data that cannot be digested is computed without caching
+    def cached(self, name, data, compute, **params):
+        try:
+            key = self.key(name, data, **params)
+        except TypeError:
+            return compute()
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        self._memory.clear()
+        if self.directory is not None:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".pkl"):
+                    os.remove(entry.path)
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _path(self, key):
+        if self.directory is None:
+            return None
+        return os.path.join(self.directory, key + ".pkl")
+
+    def _evict_files(self):
+        # Least recently used files are removed until the directory fits in max_bytes
+        # Files removed meanwhile by another process sharing the directory are skipped
+        files = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".pkl"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            total -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            self.stats["evictions"] += 1
@@ -1,3 +1,5 @@
+from itertools import islice
+
 
 def homogeneous(input_list=None):
     # Function that returns True if the elements of the input list are all of the same type
@@ -9,11 +11,63 @@ def homogeneous(input_list=None):
 
 def is_sorted(input_list=None):
     # Function that returns True if the input list is sorted (ascending or descending order)
-    # O(n) time complexity.
-    ascending = descending = False
-    if homogeneous(input_list):
-        n = len(input_list)
-        ascending = all(input_list[i] <= input_list[i + 1] for i in range(n - 1))
-        descending = all(input_list[i] >= input_list[i + 1] for i in range(n - 1))
-
-    return ascending or descending
+    # O(n) time complexity. A single pass checks the type and both directions at once,
+    # and stops as soon as the list is neither ascending nor descending
+    if not input_list:
+        return True
+
+    previous = input_list[0]
+    first_type = type(previous)
+    ascending = descending = True
+
+    try:
+        for item in islice(input_list, 1, None):
+            if not isinstance(item, first_type):  # Same check as homogeneous()
+                return False
+            if ascending and not previous <= item:
+                ascending = False
+            if descending and not previous >= item:
+                descending = False
+            if not (ascending or descending):
+                return False
+            previous = item
+    except TypeError:  # Elements of this type cannot be ordered (e.g., dicts)
+        return False
+
+    return True
+
+
+# Private tags that mark the original container type inside a frozen key.
+# Classes are used (not object() sentinels) so keys survive pickling between processes.
+class _ListTag:
+    pass
+
+
+class _DictTag:
+    pass
+
+
+def frozen_key(item=None):
+    # Function that returns a hashable key for an unhashable element
+    # Two elements that compare equal get equal keys (e.g., [1, 2] and [1.0, 2], {1} and frozenset({1}))
+    # Raises TypeError when the element cannot be frozen (opaque objects)
+    if isinstance(item, list):
+        return (_ListTag, tuple(_frozen_element(element) for element in item))
+    if isinstance(item, tuple):
+        return tuple(_frozen_element(element) for element in item)
+    if isinstance(item, dict):
+        return (_DictTag, frozenset((key, _frozen_element(value)) for key, value in item.items()))
+    if isinstance(item, (set, frozenset)):
+        return frozenset(item)  # Set members are always hashable, and set == frozenset in Python
+    if isinstance(item, bytearray):
+        return bytes(item)  # bytearray == bytes in Python
+    raise TypeError(f"Cannot build a key for unhashable type: {type(item).__name__}")
+
+
+def _frozen_element(element):
+    # Hashable elements are kept as they are, containers are frozen recursively
+    try:
+        hash(element)
+    except TypeError:
+        return frozen_key(element)
+    return element
@@ -0,0 +1,79 @@
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+
+# Instrumentation of the duplicate detection pipeline
+# Listeners are callbacks that receive one event (a dictionary) per instrumented call. With no listeners,
+# the instrumented functions only check that the list below is empty
+listeners = []
+
+
+def add_listener(callback):
+    listeners.append(callback)
+    return callback
+
+
+def remove_listener(callback):
+    listeners.remove(callback)
+
+
+def emit(event, callback=None):
+    # Sends the event to the listeners, and to the per-call callback
+    for listener in list(listeners):
+        listener(event)
+    if callable(callback):
+        callback(event)
+
+
+@contextmanager
+def measure(event, profile=False):
+    # Records the elapsed time of the block in event["seconds"]
+    # profile: also record the peak of allocated memory (tracemalloc) in event["allocated_bytes"]
+    #          and the cProfile statistics in event["profile"] (pstats.Stats)
+    if not profile:
+        start = time.perf_counter()
+        yield event
+        event["seconds"] = time.perf_counter() - start
+        return
+
+    import cProfile  # Profilers are only loaded when a call is profiled
+    import pstats
+    import tracemalloc
+
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield event
+    finally:
+        profiler.disable()
+        event["seconds"] = time.perf_counter() - start
+        event["allocated_bytes"] = tracemalloc.get_traced_memory()[1] - baseline
+        if started_tracing:
+            tracemalloc.stop()
+        event["profile"] = pstats.Stats(profiler)
+
+
+# Listener that aggregates the events per function: number of calls, elements, duplicates, time,
+# time spent in the sortedness check and the engines that were chosen
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = defaultdict(lambda: {"calls": 0, "elements": 0, "duplicates": 0, "seconds": 0.0, "is_sorted_seconds": 0.0, "engines": Counter()})
+
+    def __call__(self, event):
+        metrics = self.metrics[event["function"]]
+        metrics["calls"] += 1
+        metrics["elements"] += event.get("elements", 0)
+        metrics["duplicates"] += event.get("duplicates", 0)
+        metrics["seconds"] += event.get("seconds", 0.0)
+        metrics["is_sorted_seconds"] += event.get("is_sorted_seconds", 0.0)
+        metrics["engines"][event.get("engine")] += 1
+
+    def snapshot(self):
+        return {function: dict(metrics, engines=dict(metrics["engines"])) for function, metrics in self.metrics.items()}
@@ -0,0 +1,93 @@
+import numpy as np
+
+
+# Plotting of signals, optional: matplotlib is only imported by these functions
+
+
+# Visualization Example 1: the signal, and the signal with its duplicates in red
+def plot_duplicates(signal, duplicates=None):
+    import matplotlib.pyplot as plt
+
+    if duplicates is None:
+        duplicates = signal._detect_duplicates()
+
+    fig, ax = plt.subplots(2, 1)
+
+    ax[0].plot(signal.signal[0], signal.signal[1], c='blue', label=signal.signal_type)
+    ax[0].set_xlabel(str(list(signal.units)[0]))
+    ax[0].set_ylabel(str(list(signal.units)[1]))
+    ax[0].set_title(signal.signal_type)
+
+    ax[1].plot(signal.signal[0], signal.signal[1], c='blue', label=signal.signal_type)
+    ax[1].set_xlabel(str(list(signal.units)[0]))
+    ax[1].set_ylabel(str(list(signal.units)[1]))
+
+    for time, voltage in zip(signal.signal[0], signal.signal[1]):
+        if voltage in duplicates:
+            ax[1].scatter(time, voltage, c='red')
+
+    # To avoid adding many labels
+    if duplicates:
+        ax[1].scatter([], [], c='red', label='Duplicates')
+
+    ax[0].legend(loc='lower right')
+    ax[1].legend(loc='lower right')
+    ax[0].grid()
+    ax[1].grid()
+    plt.show()
+
+
+# Visualization Example 2: two signals on separate subplots, then both with their intersections in red
+# labels: names of the two signals, their signal types by default
+def plot_intersections(first, second, intersections, labels=None):
+    import matplotlib.pyplot as plt
+
+    first_label, second_label = labels or (first.signal_type, second.signal_type)
+
+    fig, ax = plt.subplots(3, 1)
+
+    # Plot first signal, second signal, and both signals, on separate subplots
+    ax[0].plot(first.signal[0], first.signal[1], c='blue', label=first_label)
+    ax[1].plot(second.signal[0], second.signal[1], c='red', label=second_label)
+
+    ax[2].plot(first.signal[0], first.signal[1], c='blue', label=first_label)
+    ax[2].plot(second.signal[0], second.signal[1], c='red', label=second_label)
+
+    # Set labels
+    ax[0].set_xlabel(str(list(first.units)[0]))
+    ax[1].set_xlabel(str(list(second.units)[0]))
+    ax[2].set_xlabel(str(list(second.units)[0]))
+    ax[0].set_ylabel(str(list(first.units)[1]))
+    ax[1].set_ylabel(str(list(second.units)[1]))
+    ax[2].set_ylabel(str(list(second.units)[1]))
+
+    # Set limits
+    x_min = min(min(first.signal[0]), min(second.signal[0]))
+    x_max = max(max(first.signal[0]), max(second.signal[0]))
+    y_min = min(min(first.signal[1]), min(second.signal[1]))
+    y_max = max(max(first.signal[1]), max(second.signal[1]))
+    for axis in ax:
+        axis.set_xlim([x_min, x_max])
+        axis.set_ylim([y_min, y_max])
+
+    # Set ticks
+    x_ticks = np.linspace(x_min, x_max, 5)
+    y_ticks = np.linspace(y_min, y_max, 5)
+    for axis in ax:
+        axis.set_xticks(x_ticks)
+        axis.set_yticks(y_ticks)
+
+    # Set titles and legends
+    ax[0].set_title(first_label + ' Signal')
+    ax[1].set_title(second_label + ' Signal')
+    ax[2].set_title('Signal intersections')
+
+    for time, voltage in zip(second.signal[0], second.signal[1]):
+        if voltage in intersections:
+            ax[2].scatter(time, voltage, c='red', label='Intersections')
+
+    # Show the plot
+    for axis in ax:
+        axis.grid(True)
+    plt.tight_layout()
+    plt.show()
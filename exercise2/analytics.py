@@ -0,0 +1,134 @@
+import asyncio
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from exercise2.dependency_graph import DependencyGraph
+
+
+# Batch queries on a DependencyGraph
+# The packages of a batch are searched together with a multi-source BFS: each package reached by the search keeps
+# a bitset (Python int) of the sources that reached it, and the frontier of a level only carries the new bits.
+# Each package is expanded at most once per level for the whole batch, instead of once per source.
+
+
+# Transitive dependencies of each package, with their depth (1 for direct dependencies)
+# Returns {pkg: {dependency: depth}}. The package itself is not included, unknown packages have no dependencies
+# reverse: follow the reverse index instead, i.e. the packages that depend on each package (reverse impact)
+# max_depth: stop the search at this depth
+# batch_size: number of packages searched together
+# workers: number of processes for large batches. The graph is shared with the workers through a snapshot file
+def batch_query(graph, pkgs, reverse=False, max_depth=None, batch_size=1024, workers=None):
+    return _run_batches(graph, pkgs, reverse, max_depth, batch_size, workers, sizes=False)
+
+
+def _run_batches(graph, pkgs, reverse, max_depth, batch_size, workers, sizes):
+    pkgs = list(pkgs)
+    batches = [pkgs[start:start + batch_size] for start in range(0, len(pkgs), max(batch_size, 1))]
+    query = partial(_query_batch, reverse=reverse, max_depth=max_depth, sizes=sizes)
+
+    results = {}
+    if workers is None or workers <= 1 or len(batches) <= 1:
+        for batch in batches:
+            results.update(query(graph, batch))
+        return results
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "graph.snapshot")
+        graph.save(path)  # Does not clear the cached results of the graph
+        with ProcessPoolExecutor(max_workers=workers, initializer=_load_worker_graph, initargs=(path,)) as executor:
+            for result in executor.map(partial(_query_worker, reverse=reverse, max_depth=max_depth, sizes=sizes), batches):
+                results.update(result)
+    return results
+
+
+# Same as batch_query(), without blocking the event loop. executor: default executor of the loop if None
+async def batch_query_async(graph, pkgs, reverse=False, max_depth=None, batch_size=1024, workers=None, executor=None):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, partial(batch_query, graph, list(pkgs), reverse, max_depth, batch_size, workers))
+
+
+# Packages that depend on each package, directly or transitively: {pkg: set of dependents}
+def reverse_impact(graph, pkgs, **kwargs):
+    return {pkg: set(depths) for pkg, depths in batch_query(graph, pkgs, reverse=True, **kwargs).items()}
+
+
+# Number of transitive dependencies (or dependents with reverse=True) of each package: {pkg: size}
+# The sizes are counted on the bitsets, the closures are not built
+def closure_sizes(graph, pkgs, reverse=False, max_depth=None, batch_size=1024, workers=None):
+    return _run_batches(graph, pkgs, reverse, max_depth, batch_size, workers, sizes=True)
+
+
+# Transitive dependencies of each package grouped by depth: {pkg: [[depth 1 packages], [depth 2 packages], ...]}
+def depth_levels(graph, pkgs, **kwargs):
+    levels = {}
+    for pkg, depths in batch_query(graph, pkgs, **kwargs).items():
+        levels[pkg] = [[] for _ in range(max(depths.values(), default=0))]
+        for dep, depth in depths.items():
+            levels[pkg][depth - 1].append(dep)
+    return levels
+
+
+# Depths of the packages reached from each of pkgs, or only their number (sizes)
+def _query_batch(graph, pkgs, reverse, max_depth, sizes=False):
+    neighbours = graph.dependent_ids if reverse else graph.dependency_ids
+    sources = [graph.node_id(pkg) for pkg in pkgs]
+
+    # Bit i stands for the package pkgs[i]. Sources reach themselves, so they are not part of their own closure
+    reached, frontier = {}, {}
+    for bit, node in enumerate(sources):
+        if node is not None:
+            reached[node] = frontier[node] = reached.get(node, 0) | 1 << bit
+    depths = [{} for _ in pkgs]
+
+    depth = 0
+    while frontier and (max_depth is None or depth < max_depth):
+        depth += 1
+        next_frontier = {}
+        for node, bits in frontier.items():
+            for dep in neighbours(node):
+                new = bits & ~reached.get(dep, 0)
+                if new:
+                    reached[dep] = reached.get(dep, 0) | new
+                    next_frontier[dep] = next_frontier.get(dep, 0) | new
+
+        if sizes:
+            frontier = next_frontier
+            continue
+
+        # Depths of the packages reached at this level, for each of the sources
+        for node, bits in next_frontier.items():
+            name = graph.node_name(node)
+            while bits:
+                lowest = bits & -bits
+                depths[lowest.bit_length() - 1][name] = depth
+                bits ^= lowest
+        frontier = next_frontier
+
+    if not sizes:
+        return dict(zip(pkgs, depths))
+
+    # Bit-sliced counters: planes[j] holds bit j of the count of every source, all the sources are counted at once
+    planes = []
+    for bits in reached.values():
+        for plane, value in enumerate(planes):
+            planes[plane], bits = value ^ bits, value & bits
+            if not bits:
+                break
+        if bits:
+            planes.append(bits)
+    counts = [sum(((value >> bit) & 1) << plane for plane, value in enumerate(planes)) for bit in range(len(pkgs))]
+    return {pkg: count - 1 if node is not None else 0 for pkg, node, count in zip(pkgs, sources, counts)}  # Without the source
+
+
+# Graph of the worker process, loaded from the snapshot by the pool initializer
+_worker_graph = None
+
+
+def _load_worker_graph(path):
+    global _worker_graph
+    _worker_graph = DependencyGraph.load(path)
+
+
+def _query_worker(pkgs, reverse, max_depth, sizes):
+    return _query_batch(_worker_graph, pkgs, reverse, max_depth, sizes)
@@ -1,50 +1,865 @@
+import codecs
 import json
-from collections import defaultdict
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import time
+import warnings
+from array import array
+from collections.abc import Mapping, Sequence
+from itertools import chain, filterfalse, repeat
 
 
 # 2.2) Reconstruct full dependency graph
+# Package names are interned to integer IDs, and the dependencies are stored in CSR arrays:
+# the dependencies of the node i are _targets[_offsets[i]:_offsets[i + 1]], without repeated edges.
+# New edges are buffered and merged into the arrays when the graph is first read. Later changes replace
+# the rows of the modified packages (_overrides), and only invalidate the cached closures of their dependents
 class DependencyGraph:
     def __init__(self):
-        # Will automatically create new lists for the keys that are not yet of the dictionary
-        self.graph = defaultdict(list)
+        self._names = []  # ID -> package name
+        self._name_ids = {}  # Package name -> ID, see _ids
+        self._declared = bytearray()  # 1 for the packages that were added with add_edge, per ID
+        self._order = array('i')  # IDs of the declared packages, in order of declaration
+        self._offsets = array('q', [0])
+        self._targets = array('i')
+        self._pending_src = array('i')  # Edges that are not yet merged into the CSR arrays
+        self._pending_dst = array('i')
+        self._compiled = False  # True once the pending edges are merged, later changes go to _overrides
+        self._overrides = {}  # ID -> dependency IDs, replaces the row of the CSR arrays
+        self._reverse = None  # Reverse dependencies (dependents) in CSR arrays and override rows, built on first use
+        self._components = None  # Strongly connected components of the whole graph, built on first use
+        self._closures = {}  # ID -> IDs of the packages it reaches and of its cycle, in install order (memoized slices)
+        self._snapshot = None  # Memory map of the snapshot file the arrays were loaded from
+
+    # Read-only view of the graph: package name -> list of dependency names, for the declared packages
+    @property
+    def graph(self):
+        return GraphView(self)
 
     # Function to add edge for package's dependencies
     def add_edge(self, pkg, deps):
-        # If package not in graph, a new list is automatically created with the dependencies
-        self.graph[pkg].extend(deps)
+        node = self._intern(pkg)
+        if not self._declared[node]:
+            self._declared[node] = 1
+            self._order.append(node)
+        if not self._compiled:
+            for dep in deps:
+                self._pending_src.append(node)
+                self._pending_dst.append(self._intern(dep))
+            return
+
+        row = self._successors(node)
+        existing = set(row)
+        added = [dep for dep in dict.fromkeys(map(self._intern, deps)) if dep not in existing]
+        if added:
+            self._set_row(node, list(row) + added, added=added)
+
+    # Removes the dependency of the package. Raises KeyError if the package does not depend on it
+    def remove_edge(self, pkg, dep):
+        node, target = self._ids.get(pkg), self._ids.get(dep)
+        row = list(self._successors(node)) if node is not None else []
+        if target not in row:
+            raise KeyError((pkg, dep))
+        row.remove(target)
+        self._set_row(node, row, removed=[target])
+
+    # Removes the package and its dependencies from the graph, as if its entry was deleted from the manifest.
+    # Packages that depend on it keep their edges. Raises KeyError if the package was not added with add_edge
+    def remove_package(self, pkg):
+        node = self._ids.get(pkg)
+        if node is None or not self._declared[node]:
+            raise KeyError(pkg)
+        self._declared[node] = 0
+        self._order.remove(node)
+        row = list(self._successors(node))
+        if row:
+            self._set_row(node, [], removed=row)
+
+    # Replaces the dependencies of a declared package, keeping its position in the order of declaration
+    def _replace_dependencies(self, node, deps):
+        row, new = list(self._successors(node)), list(dict.fromkeys(map(self._intern, deps)))
+        old = set(row)
+        added = [dep for dep in new if dep not in old]
+        old.difference_update(new)
+        self._set_row(node, new, added=added, removed=[dep for dep in row if dep in old])
+
+    # Applies a diff between two versions of a manifest, see manifest_diff()
+    def apply_diff(self, diff):
+        for pkg in diff.get("removed", ()):
+            self.remove_package(pkg)
+        for pkg, deps in diff.get("added", {}).items():
+            self.add_edge(pkg, deps)
+        for pkg, change in diff.get("changed", {}).items():
+            for dep in change.get("removed", ()):
+                self.remove_edge(pkg, dep)
+            self.add_edge(pkg, change.get("added", ()))
+
+    # Number of dependency edges, without repeated edges
+    @property
+    def num_edges(self):
+        self._compile_pending()
+        edges = len(self._targets)
+        for node, row in self._overrides.items():
+            if node + 1 < len(self._offsets):
+                edges -= self._offsets[node + 1] - self._offsets[node]
+            edges += len(row)
+        return edges
+
+    # Integer IDs of the packages, for algorithms that work on the whole graph (e.g. analytics.py).
+    # IDs do not change while the graph is modified. node_id() returns None for unknown packages
+    def node_id(self, pkg):
+        return self._ids.get(pkg)
+
+    def node_name(self, node):
+        return self._names[node]
+
+    # IDs of the dependencies of a node
+    def dependency_ids(self, node):
+        return self._successors(node)
+
+    # IDs of the packages that depend directly on a node, in increasing order
+    def dependent_ids(self, node):
+        return self._dependents(node)
+
+    # Dependency names of the package, empty for unknown packages
+    def dependencies(self, pkg):
+        node = self._ids.get(pkg)
+        if node is None:
+            return []
+        return [self._names[dep] for dep in self._successors(node)]
+
+    # Names of the packages that depend directly on the package
+    def dependents(self, pkg):
+        node = self._ids.get(pkg)
+        if node is None:
+            return []
+        return [self._names[dep] for dep in sorted(self._dependents(node))]
+
+    # Transitive dependencies of the package, in install order (dependencies first). Empty for unknown packages
+    # Closures are memoized per package, and a change only invalidates the closures of the packages that depend on it.
+    # The memoized closures of the dependencies are reused, see _closure()
+    def resolve(self, pkg):
+        node = self._ids.get(pkg)
+        if node is None:
+            return []
+        closure = self._closures.get(node)
+        if closure is None:
+            closure = self._closure(node)
+        return [self._names[dep] for dep in closure if dep != node]
+
+    # All the packages (declared or dependencies of a declared package) in install order: every package comes after its dependencies,
+    # the packages of a cycle are kept together
+    def install_order(self):
+        return [self._names[node] for component in self._all_components() for node in component]
+
+    # Packages of each dependency cycle
+    def cycles(self):
+        cycles = []
+        for component in self._all_components():
+            if len(component) > 1 or component[0] in self._successors(component[0]):
+                cycles.append([self._names[node] for node in component])
+        return cycles
+
+    # Saves the graph to a binary snapshot: header, CSR arrays, declared packages and the name table (UTF-8).
+    # Arrays are stored in native byte order, so snapshots are a cache for the machine that wrote them
+    # source: manifest file the graph was built from, its size and modification time are stored to detect stale snapshots
+    # The changed rows are merged into copies of the arrays, the cached results of the graph are kept
+    def save(self, path, source=None):
+        self._compile_pending()
+        offsets, targets = self._offsets, self._targets
+        if self._overrides or len(offsets) != len(self._names) + 1:
+            offsets, targets = self._merged_arrays()
+        encoded = [name.encode("utf-8") for name in self._names]
+        name_offsets = array('q', [0])
+        for name in encoded:
+            name_offsets.append(name_offsets[-1] + len(name))
+        source_size, source_mtime = _source_signature(source) if source is not None else (-1, -1)
+        header = struct.pack(_SNAPSHOT_HEADER, _SNAPSHOT_MAGIC, _SNAPSHOT_VERSION, source_size, source_mtime,
+                             len(self._names), len(self._order), len(targets), name_offsets[-1])
+
+        # Sections with 8-byte items first, then 4-byte items, then bytes: every section stays aligned
+        sections = [header, offsets, name_offsets, self._order, targets, self._declared]
+        directory = os.path.dirname(os.path.abspath(path))
+        descriptor, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                for section in sections:
+                    file.write(section)
+                file.writelines(encoded)
+            os.replace(temporary, path)  # Readers never see a partial snapshot
+        except BaseException:
+            os.remove(temporary)
+            raise
+
+    # Loads a snapshot written by save(). The arrays are memoryviews of a memory map of the file (no copies),
+    # names are decoded on access. Raises ValueError if the file is not a snapshot
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as file:
+            memory = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        header = _read_snapshot_header(memory)
+        _, _, _, _, num_names, num_declared, num_edges, names_size = header
+
+        view, position = memoryview(memory), struct.calcsize(_SNAPSHOT_HEADER)
+        arrays = []
+        for typecode, length in (('q', num_names + 1), ('q', num_names + 1), ('i', num_declared), ('i', num_edges), ('B', num_names)):
+            end = position + length * struct.calcsize(typecode)
+            arrays.append(view[position:end].cast(typecode))
+            position = end
+        offsets, name_offsets, order, targets, declared = arrays
+
+        DG = cls()
+        DG._names = _NameTable(name_offsets, view[position:position + names_size])
+        DG._name_ids = None
+        DG._offsets, DG._targets = offsets, targets
+        DG._declared, DG._order = bytearray(declared), array('i', order)  # Small, and modified by add_edge
+        DG._compiled = True
+        DG._snapshot = memory
+        return DG
 
     # Function to print graph to console
+    # The dependencies of the package are printed below it with increased indentation, see render()
     def display_graph(self, pkg, indent=0):
-        # Required whitespaces plus package print
-        print('  ' * indent + '- ' + pkg)
-        for dep in self.graph[pkg]:
-            # Recursively print next dependencies with increased indentation
-            self.display_graph(dep, indent + 1)
+        self.render([pkg], indent=indent)
+
+    # Writes the dependency trees of the packages (all the declared packages by default) through one buffered writer
+    # file: text file, standard output by default
+    # format: "text" (indented tree), "jsonl" (one JSON object per line: package, depth, parent, marker) or "dot" (Graphviz)
+    # max_depth: packages at this depth are not expanded and are marked "truncated"
+    # collapse: packages that were already expanded are marked "repeated" instead of being expanded again,
+    #           so the output grows with the number of edges instead of the number of paths. Always on for DOT, which lists edges
+    # A dependency that closes a cycle is marked "cycle" and not expanded again
+    def render(self, pkgs=None, file=None, format="text", max_depth=None, collapse=False, indent=0):
+        if format not in ("text", "jsonl", "dot"):
+            raise ValueError("Invalid format. Allowed values are 'text', 'jsonl' or 'dot'.")
+        file = sys.stdout if file is None else file
+        pkgs = self.graph if pkgs is None else pkgs
+        tree = self._tree(pkgs, max_depth, collapse or format == "dot")
+
+        if format == "text":
+            lines = ('  ' * (indent + depth) + '- ' + pkg + (f' ({marker})' if marker else '') + '\n' for pkg, depth, _, marker in tree)
+        elif format == "jsonl":
+            lines = (json.dumps({"package": pkg, "depth": depth, "parent": parent, "marker": marker}, ensure_ascii=False) + '\n'
+                     for pkg, depth, parent, marker in tree)
+        else:
+            lines = chain(['digraph dependencies {\n'], self._dot_lines(tree), ['}\n'])
+
+        buffer = []
+        for line in lines:
+            buffer.append(line)
+            if len(buffer) >= 4096:
+                file.write(''.join(buffer))
+                buffer.clear()
+        file.write(''.join(buffer))
+
+    @staticmethod
+    def _dot_lines(tree):
+        for pkg, _, parent, marker in tree:
+            if parent is None:
+                if marker != "repeated":
+                    yield '  ' + json.dumps(pkg, ensure_ascii=False) + ';\n'
+            else:
+                yield '  ' + json.dumps(parent, ensure_ascii=False) + ' -> ' + json.dumps(pkg, ensure_ascii=False) + ';\n'
+
+    # Depth-first walk of the dependency trees, without recursion: yields (package, depth, parent, marker) per line.
+    # marker is None for expanded packages and leaves, otherwise "cycle", "repeated" or "truncated"
+    def _tree(self, pkgs, max_depth, collapse):
+        names, expanded = self._names, set()
+
+        def marker(node, depth, path):
+            if node in path:
+                return "cycle"
+            if not self._successors(node):
+                return None  # Leaf, nothing to collapse or truncate
+            if collapse and node in expanded:
+                return "repeated"
+            if max_depth is not None and depth >= max_depth:
+                return "truncated"
+            return None
+
+        for pkg in pkgs:
+            root = self._ids.get(pkg)
+            if root is None:
+                yield pkg, 0, None, None
+                continue
+            root_marker = marker(root, 0, ())
+            yield pkg, 0, None, root_marker
+            if root_marker is not None:
+                continue
+
+            expanded.add(root)
+            path, stack = {root}, [(root, iter(self._successors(root)))]
+            while stack:
+                parent, deps = stack[-1]
+                dep = next(deps, -1)
+                if dep < 0:
+                    path.discard(stack.pop()[0])
+                    continue
+                dep_marker = marker(dep, len(stack), path)
+                yield names[dep], len(stack), names[parent], dep_marker
+                if dep_marker is None:
+                    expanded.add(dep)
+                    path.add(dep)
+                    stack.append((dep, iter(self._successors(dep))))
+
+    # Package name -> ID, built on first use for graphs loaded from a snapshot
+    @property
+    def _ids(self):
+        if self._name_ids is None:
+            self._name_ids = {name: node for node, name in enumerate(self._names.decode_all())}
+        return self._name_ids
+
+    def _intern(self, name):
+        node = self._ids.get(name)
+        if node is None:
+            node = self._ids[name] = len(self._names)
+            self._names.append(name)
+            self._declared.append(0)
+            self._components = None
+        return node
+
+    def _successors(self, node):
+        self._compile_pending()
+        row = self._overrides.get(node)
+        if row is None:
+            if node + 1 >= len(self._offsets):
+                return ()  # Interned after the arrays were built
+            row = self._targets[self._offsets[node]:self._offsets[node + 1]]
+        return row
+
+    def _dependents(self, node):
+        offsets, sources, overrides = self._reverse_index()
+        row = overrides.get(node)
+        if row is None:
+            if node + 1 >= len(offsets):
+                return ()
+            row = sources[offsets[node]:offsets[node + 1]]
+        return row
+
+    # Replaces the dependencies of a package, updates the reverse index with the added and removed edges
+    # and invalidates the cached results that depend on the package
+    def _set_row(self, node, row, added=(), removed=()):
+        self._overrides[node] = array('i', row)
+        if self._reverse is not None:
+            for dep in added:
+                self._dependents_row(dep).append(node)
+            for dep in removed:
+                self._dependents_row(dep).remove(node)
+        self._invalidate(node)
+
+    def _dependents_row(self, node):
+        overrides = self._reverse[2]
+        if node not in overrides:
+            overrides[node] = list(self._dependents(node))
+        return overrides[node]
+
+    # Drops the cached closures of the package and of all the packages that depend on it (reverse index)
+    def _invalidate(self, node):
+        self._components = None
+        if not self._closures:
+            return
+        seen, stack = {node}, [node]
+        while stack:
+            current = stack.pop()
+            self._closures.pop(current, None)
+            for dependent in self._dependents(current):
+                if dependent not in seen:
+                    seen.add(dependent)
+                    stack.append(dependent)
+
+    # Merges the pending edges into the CSR arrays on the first read
+    def _compile_pending(self):
+        if not self._compiled:
+            self._compile()
+
+    # Merges the pending edges and the changed rows into the CSR arrays.
+    # Repeated edges are dropped, the first occurrence keeps its position
+    def _compile(self):
+        size = len(self._names)
+        pending_src, pending_dst = self._pending_src, self._pending_dst
+
+        # Counting sort of the pending edges by source, keeps their order within each source
+        start = array('q', bytes(8 * (size + 1)))
+        for src in pending_src:
+            start[src + 1] += 1
+        for node in range(size):
+            start[node + 1] += start[node]
+        grouped = array('i', bytes(4 * len(pending_dst)))
+        position = array('q', start)
+        for src, dst in zip(pending_src, pending_dst):
+            grouped[position[src]] = dst
+            position[src] += 1
+
+        old_offsets, old_targets = self._offsets, self._targets
+        offsets, targets = array('q', [0]), array('i')
+        for node in range(size):
+            row = self._overrides.get(node)
+            if row is None:
+                row = old_targets[old_offsets[node]:old_offsets[node + 1]] if node + 1 < len(old_offsets) else ()
+            if start[node] != start[node + 1]:
+                row = dict.fromkeys(chain(row, grouped[start[node]:start[node + 1]]))
+            targets.extend(row)
+            offsets.append(len(targets))
+
+        self._offsets, self._targets = offsets, targets
+        self._pending_src, self._pending_dst = array('i'), array('i')
+        self._compiled = True
+        self._overrides = {}
+        self._reverse = self._components = None
+        self._closures = {}
+
+    # CSR arrays of the current rows, including the changed rows and the packages interned after the arrays were built
+    def _merged_arrays(self):
+        offsets, targets = array('q', [0]), array('i')
+        for node in range(len(self._names)):
+            targets.extend(self._successors(node))
+            offsets.append(len(targets))
+        return offsets, targets
+
+    # Reverse dependencies: CSR arrays (offsets, sources) with the sources in increasing order of ID,
+    # and the rows changed since they were built
+    def _reverse_index(self):
+        self._compile_pending()
+        if self._reverse is None:
+            size = len(self._names)
+            offsets = array('q', bytes(8 * (size + 1)))
+            for src in range(size):
+                for dst in self._successors(src):
+                    offsets[dst + 1] += 1
+            for node in range(size):
+                offsets[node + 1] += offsets[node]
+            sources = array('i', bytes(4 * offsets[size]))
+            position = array('q', offsets)
+            for src in range(size):
+                for dst in self._successors(src):
+                    sources[position[dst]] = src
+                    position[dst] += 1
+            self._reverse = offsets, sources, {}
+        return self._reverse
+
+    # Components of the packages in the graph: the declared packages and their dependencies. Packages that were removed
+    # and are no longer a dependency of another package stay interned, but are left out
+    def _all_components(self):
+        if self._components is None:
+            present = bytearray(self._declared)
+            for node in self._order:  # Only declared packages have dependencies
+                for dep in self._successors(node):
+                    present[dep] = 1
+            self._components = self._strongly_connected(node for node in range(len(self._names)) if present[node])
+        return self._components
+
+    # Strongly connected components reachable from the roots, with an iterative Tarjan's algorithm.
+    # Components are returned in reverse topological order (dependencies first), their IDs in increasing order
+    def _strongly_connected(self, roots):
+        index, low = {}, {}  # Visit order of each node, lowest visit order reachable from its subtree
+        stack, on_stack, components = [], set(), []
+        for root in roots:
+            if root in index:
+                continue
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(self._successors(root)))]  # Depth-first path: node and its remaining dependencies
+            while work:
+                node, deps = work[-1]
+                for dep in deps:
+                    if dep not in index:
+                        index[dep] = low[dep] = len(index)
+                        stack.append(dep)
+                        on_stack.add(dep)
+                        work.append((dep, iter(self._successors(dep))))
+                        break
+                    if dep in on_stack and index[dep] < low[node]:
+                        low[node] = index[dep]
+                else:
+                    work.pop()
+                    if work and low[node] < low[work[-1][0]]:
+                        low[work[-1][0]] = low[node]
+                    if low[node] == index[node]:  # Root of a component, its members are on top of the stack
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        components.append(sorted(component))
+        return components
 
+    # Closure of a node over the condensation of the graph, with an iterative Tarjan's algorithm: the components are
+    # emitted into one array in reverse topological order (install order), and the memoized closures met on the way are
+    # spliced into it instead of being searched again. Every component whose closure is a contiguous slice of the array
+    # (it reaches nothing that was emitted before it was discovered) is memoized as a memoryview of that slice, without copies.
+    # Returns the memoized closure of the node, which includes the node and its cycle
+    def _closure(self, root):
+        emitted = array('i')
+        lowest = {}  # Emitted node -> lowest position of the emitted nodes it reaches
+        index, low, start, reach = {root: 0}, {root: 0}, {root: 0}, {root: 0}  # reach: lowest position reached by the edges
+        stack, slices = [root], []
+        spliced = []  # Closures copied into an empty array, their nodes are added to lowest only when they are looked up
+        work = [(root, iter(self._successors(root)))]
+        while work:
+            node, deps = work[-1]
+            for dep in deps:
+                if dep not in index and dep not in lowest:
+                    for closure, reached in spliced:
+                        lowest.update(dict.fromkeys(closure, reached))
+                    spliced.clear()
+                if dep not in index and dep not in lowest:
+                    closure = self._closures.get(dep)
+                    if closure is None:
+                        index[dep] = low[dep] = len(index)
+                        start[dep] = reach[dep] = len(emitted)
+                        stack.append(dep)
+                        work.append((dep, iter(self._successors(dep))))
+                        break
+                    if not emitted:  # Nothing to skip, the closure is copied as it is
+                        emitted.frombytes(closure.cast('B'))
+                        spliced.append((closure, 0))
+                        reach[node] = 0
+                        continue
+                    self._splice(closure, emitted, lowest)
+                if dep in lowest:
+                    if lowest[dep] < reach[node]:
+                        reach[node] = lowest[dep]
+                elif index[dep] < low[node]:  # On the stack, same component
+                    low[node] = index[dep]
+            else:
+                work.pop()
+                if low[node] == index[node]:  # Root of a component, its members are on top of the stack
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        component.append(member)
+                        if member == node:
+                            break
+                    component.sort()
+                    reached = min(reach[member] for member in component)
+                    lowest.update(dict.fromkeys(component, reached))
+                    emitted.extend(component)
+                    if reached >= start[node]:
+                        slices.append((component, start[node], len(emitted)))
+                if work:
+                    parent = work[-1][0]
+                    if node in lowest:
+                        if lowest[node] < reach[parent]:
+                            reach[parent] = lowest[node]
+                    elif low[node] < low[parent]:
+                        low[parent] = low[node]
 
-def build_graph(filename):
+        # Views are taken once the array is complete, it cannot grow while they exist
+        view = memoryview(emitted)
+        for component, first, end in slices:
+            self._closures.update(dict.fromkeys(component, view[first:end]))
+        return self._closures[root]
 
-    # 2.1) Read json data
-    with open(filename, 'r') as file:
-        data = json.load(file)
+    @staticmethod
+    def _splice(closure, emitted, lowest):
+        # Appends the nodes of a memoized closure that are not emitted yet. They only reach nodes of the closure,
+        # so the lowest position of the closure nodes bounds the positions they reach
+        reached = min(map(lowest.get, closure, repeat(len(emitted))))
+        new = list(filterfalse(lowest.__contains__, closure))
+        emitted.extend(new)
+        lowest.update(dict.fromkeys(new, reached))
+
+
+# Diff between two versions of a manifest {pkg: [deps]}, as JSON-serializable data for DependencyGraph.apply_diff():
+# {"added": {pkg: [deps]}, "removed": [pkg], "changed": {pkg: {"added": [deps], "removed": [deps]}}}
+# Changes in the order of the dependencies are not part of the diff
+def manifest_diff(old, new):
+    diff = {"added": {}, "removed": [pkg for pkg in old if pkg not in new], "changed": {}}
+    for pkg, deps in new.items():
+        if pkg not in old:
+            diff["added"][pkg] = list(deps)
+            continue
+        old_deps, new_deps = set(old[pkg]), set(deps)
+        if old_deps != new_deps:
+            diff["changed"][pkg] = {"added": [dep for dep in dict.fromkeys(deps) if dep not in old_deps],
+                                    "removed": [dep for dep in dict.fromkeys(old[pkg]) if dep not in new_deps]}
+    return diff
+
+
+# Names of a snapshot, decoded on access. New names are appended to a list
+class _NameTable(Sequence):
+    def __init__(self, offsets, data):
+        self._offsets = offsets
+        self._data = data
+        self._added = []
+
+    def __len__(self):
+        return len(self._offsets) - 1 + len(self._added)
+
+    def __getitem__(self, node):
+        stored = len(self._offsets) - 1
+        if node < 0 or node >= stored:
+            return self._added[node - stored if node >= 0 else node]
+        return str(self._data[self._offsets[node]:self._offsets[node + 1]], "utf-8")
+
+    def append(self, name):
+        self._added.append(name)
+
+    # All the names, decoded at once
+    def decode_all(self):
+        data = bytes(self._data)
+        text = data.decode("utf-8")
+        if len(text) != len(data):  # Non-ASCII names, byte offsets are not character offsets
+            return [str(data[start:end], "utf-8") for start, end in zip(self._offsets, self._offsets[1:])] + self._added
+        return [text[start:end] for start, end in zip(self._offsets, self._offsets[1:])] + self._added
+
+
+# Snapshot header: magic, format version, source size and modification time (ns, -1 without source),
+# number of names, declared packages and edges, size of the name table
+_SNAPSHOT_HEADER = "=8sI4xqqqqqq"
+_SNAPSHOT_MAGIC = b"DEPGRAPH"
+_SNAPSHOT_VERSION = 1
+
+
+def _read_snapshot_header(buffer):
+    size = struct.calcsize(_SNAPSHOT_HEADER)
+    if len(buffer) < size:
+        raise ValueError("Not a dependency graph snapshot.")
+    header = struct.unpack_from(_SNAPSHOT_HEADER, buffer)
+    if header[0] != _SNAPSHOT_MAGIC or header[1] != _SNAPSHOT_VERSION:
+        raise ValueError("Not a dependency graph snapshot, or written by another version.")
+    return header
+
+
+def _source_signature(source):
+    status = os.stat(source)
+    return status.st_size, status.st_mtime_ns
+
+
+# True if the snapshot exists and was saved from the current version of the source file
+def snapshot_is_fresh(path, source):
+    try:
+        with open(path, 'rb') as file:
+            header = _read_snapshot_header(file.read(struct.calcsize(_SNAPSHOT_HEADER)))
+        return header[2:4] == _source_signature(source)
+    except (OSError, ValueError):
+        return False
+
+
+# Read-only mapping of a DependencyGraph, package name -> list of dependency names
+# Iterates over the declared packages in order of declaration
+class GraphView(Mapping):
+    def __init__(self, dependency_graph):
+        self._dependency_graph = dependency_graph
+
+    def __getitem__(self, pkg):
+        graph = self._dependency_graph
+        node = graph._ids.get(pkg)
+        if node is None or not graph._declared[node]:
+            raise KeyError(pkg)
+        return [graph._names[dep] for dep in graph._successors(node)]
+
+    def __iter__(self):
+        names = self._dependency_graph._names
+        return (names[node] for node in self._dependency_graph._order)
+
+    def __len__(self):
+        return len(self._dependency_graph._order)
+
+    def __repr__(self):
+        return f"GraphView({dict(self)!r})"
+
+
+# filename: JSON object {pkg: [deps]}, or newline-delimited JSON (format="ndjson") with one or more entries per line
+# streaming: parse the entries one at a time straight into the graph, instead of loading the whole file with json.load.
+#            Newline-delimited files are always streamed. In both formats a repeated package replaces its dependencies
+#            (the last entry wins, as with json.load), and data after the JSON object is an error
+# use_mmap: read the file through a memory map (streaming only)
+# stats: optional dictionary, filled with the size of the input, the number of packages and edges (without repeated edges),
+#        and the parse throughput
+# snapshot: True or a path for a binary snapshot of the graph (default path: filename + ".snapshot"). The snapshot is loaded
+#           if it was saved from the current version of the file (same size and modification time), otherwise it is rewritten.
+#           A snapshot that cannot be written only gives a RuntimeWarning
+def build_graph(filename, streaming=False, format="json", use_mmap=False, stats=None, snapshot=False):
+    if format not in ("json", "ndjson"):
+        raise ValueError("Invalid format. Allowed values are 'json' or 'ndjson'.")
+
+    start = time.perf_counter()
+    if snapshot:
+        path = f"{filename}.snapshot" if snapshot is True else snapshot
+        if snapshot_is_fresh(path, filename):
+            DG = DependencyGraph.load(path)
+            if stats is not None:
+                seconds = max(time.perf_counter() - start, 1e-9)
+                stats.update(bytes=os.path.getsize(filename), packages=len(DG.graph), edges=DG.num_edges, seconds=seconds, snapshot=True)
+            return DG
+        DG = build_graph(filename, streaming, format, use_mmap, stats)
+        try:
+            DG.save(path, source=filename)
+        except OSError as error:  # The snapshot is only a cache, the graph is still valid
+            warnings.warn(f"Cannot save the snapshot {path}: {error}", RuntimeWarning, stacklevel=2)
+        return DG
 
     # Create instance of a Dependency Graph (DG)
     DG = DependencyGraph()
 
-    for pkg, deps in data.items():
-        DG.add_edge(pkg, deps)
+    if streaming or format == "ndjson":
+        entries = iter_manifest(filename, format, use_mmap)
+    else:
+        # 2.1) Read json data
+        with open(filename, 'r') as file:
+            data = json.load(file)
+        entries = data.items()
+
+    for pkg, deps in entries:
+        node = DG.node_id(pkg)
+        if node is not None and DG._declared[node]:
+            DG._replace_dependencies(node, deps)  # Repeated key, the last one wins as with json.load
+        else:
+            DG.add_edge(pkg, deps)
 
+    if stats is not None:
+        seconds = max(time.perf_counter() - start, 1e-9)
+        size = os.path.getsize(filename)
+        stats.update(bytes=size, packages=len(DG.graph), edges=DG.num_edges, seconds=seconds, snapshot=False,
+                     bytes_per_second=size / seconds, packages_per_second=len(DG.graph) / seconds)
     return DG
 
 
+# Generator of the (pkg, deps) entries of a manifest file, parsed incrementally: only one chunk of the file
+# and one entry are in memory at a time
+def iter_manifest(filename, format="json", use_mmap=False, chunk_size=1 << 20):
+    chunks = _read_chunks(filename, use_mmap, chunk_size)
+    if format == "ndjson":
+        return _iter_ndjson(chunks)
+    return iter(_JsonObjectReader(chunks))
+
+
+# Text chunks of a UTF-8 file, read from the file object or from a memory map
+def _read_chunks(filename, use_mmap, chunk_size):
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    with open(filename, 'rb') as file:
+        if use_mmap and os.fstat(file.fileno()).st_size > 0:  # Empty files cannot be mapped
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as memory:
+                for start in range(0, len(memory), chunk_size):
+                    yield decoder.decode(memory[start:start + chunk_size])
+        else:
+            for chunk in iter(lambda: file.read(chunk_size), b""):
+                yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+def _iter_ndjson(chunks):
+    rest = ""
+    for chunk in chain(chunks, ["\n"]):
+        lines = (rest + chunk).split("\n")
+        rest = lines.pop()  # Incomplete last line
+        for line in lines:
+            if line.strip():
+                yield from _manifest_items(json.loads(line))
+
+
+def _manifest_items(data):
+    if not isinstance(data, dict):
+        raise ValueError("Manifest entries must be JSON objects of package: [dependencies].")
+    return data.items()
+
+
+# Characters that end a token: a decoding error followed by one of them is not caused by the end of the buffer
+_TOKEN_END = re.compile(r'[\s,:\[\]{}"]')
+
+
+# Incremental parser of one JSON object {pkg: [deps]}. Keys and values are decoded with JSONDecoder.raw_decode
+# from a buffer, which is refilled from the chunks when a token is cut at the end of the buffer.
+# Repeated keys are all yielded (consumers keep the last one, as json.load), and data after the object is an error
+class _JsonObjectReader:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.position = 0
+
+    def __iter__(self):
+        self.expect("{")
+        if self.expect('"}') == "}":
+            self.expect_end()
+            return
+        while True:
+            self.position -= 1  # The key starts at the opening quote
+            pkg = self.decode()
+            self.expect(":")
+            deps = self.decode()
+            if not isinstance(deps, list):
+                raise ValueError(f"Dependencies of {pkg!r} must be a JSON list.")
+            yield pkg, deps
+            if self.expect(",}") == "}":
+                self.expect_end()
+                return
+            self.expect('"')
+
+    # Skips whitespace, False at the end of the file
+    def skip_whitespace(self):
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in " \t\r\n":
+                self.position += 1
+            if self.position < len(self.buffer):
+                return True
+            if not self.refill():
+                return False
+
+    # Returns the next character, which must be one of expected
+    def expect(self, expected):
+        if not self.skip_whitespace():
+            raise json.JSONDecodeError("Unexpected end of manifest", self.buffer, self.position)
+        character = self.buffer[self.position]
+        if character not in expected:
+            raise json.JSONDecodeError(f"Expecting one of {expected!r}", self.buffer, self.position)
+        self.position += 1
+        return character
+
+    # Only whitespace can follow the object
+    def expect_end(self):
+        if self.skip_whitespace():
+            raise json.JSONDecodeError("Extra data", self.buffer, self.position)
+
+    def decode(self):
+        self.skip_whitespace()
+        while True:
+            try:
+                result, self.position = self.decoder.raw_decode(self.buffer, self.position)
+                return result
+            except json.JSONDecodeError as error:
+                # An unterminated string, or an error in the last token of the buffer, may be completed by the next chunks.
+                # The retry reads at least as much data as is pending, so a token split over many chunks is decoded in linear time
+                incomplete = error.msg.startswith("Unterminated string") or not _TOKEN_END.search(error.doc, error.pos)
+                if not incomplete or not self.refill(len(self.buffer) - self.position):
+                    raise
+
+    # Appends the next chunks (at least size characters, unless the file ends) to the buffer and drops the consumed part.
+    # False at the end of the file
+    def refill(self, size=1):
+        chunks, length = [], 0
+        for chunk in self.chunks:
+            chunks.append(chunk)
+            length += len(chunk)
+            if length >= size:
+                break
+        if not length:
+            return False
+        self.buffer, self.position = self.buffer[self.position:] + "".join(chunks), 0
+        return True
+
+
 def main():
 
     # Fixed location in the filesystem
     filename = '/tmp/deps.json'
 
     # 2.3) Function that takes a filename and returns an object representing the fully resolved graph
-    DG = build_graph(filename)
+    # Repeated runs load the compiled snapshot of the file instead of parsing it again
+    DG = build_graph(filename, snapshot=True)
 
     # 2.4) Display graph when executed
-    for pkg in DG.graph:
-        DG.display_graph(pkg)
+    # Packages that were already displayed are not expanded again, so the output grows with the size of the graph
+    DG.render(collapse=True)
+
+    print('Install order: ' + ', '.join(DG.install_order()))
+    for cycle in DG.cycles():
+        print('Dependency cycle: ' + ', '.join(cycle))
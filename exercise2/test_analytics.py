@@ -0,0 +1,54 @@
+import asyncio
+import pytest
+from exercise2.dependency_graph import DependencyGraph
+from exercise2.analytics import batch_query, batch_query_async, reverse_impact, closure_sizes, depth_levels
+
+
+@pytest.fixture
+def graph():
+    graph = DependencyGraph()
+    graph.add_edge("app", ["lib1", "lib2"])
+    graph.add_edge("lib1", ["base"])
+    graph.add_edge("lib2", ["base", "extra"])
+    graph.add_edge("base", [])
+    graph.add_edge("cycle1", ["cycle2"])
+    graph.add_edge("cycle2", ["cycle1", "base"])
+    return graph
+
+
+def test_batch_query(graph):
+    pkgs = list(graph.graph) + ["unknown"]
+    results = batch_query(graph, pkgs, batch_size=2)
+    for pkg in pkgs:
+        assert set(results[pkg]) == set(graph.resolve(pkg))  # Same closures as one package at a time
+    assert results["app"] == {"lib1": 1, "lib2": 1, "base": 2, "extra": 2}
+    assert results["cycle1"] == {"cycle2": 1, "base": 2}
+
+    assert batch_query(graph, ["app"], max_depth=1) == {"app": {"lib1": 1, "lib2": 1}}
+    assert closure_sizes(graph, ["app", "base"]) == {"app": 4, "base": 0}
+    assert depth_levels(graph, ["app"]) == {"app": [["lib1", "lib2"], ["base", "extra"]]}
+    assert reverse_impact(graph, ["base", "app"]) == {"base": {"lib1", "lib2", "app", "cycle1", "cycle2"}, "app": set()}
+
+
+def test_batch_query_parallel(graph):
+    pkgs = list(graph.graph)
+    assert batch_query(graph, pkgs, batch_size=2, workers=2) == batch_query(graph, pkgs)
+    assert reverse_impact(graph, pkgs, batch_size=2, workers=2) == reverse_impact(graph, pkgs)
+
+
+# The graph is shared with the workers through a snapshot, which includes the changed rows and keeps the cached closures
+def test_batch_query_parallel_modified(graph):
+    assert graph.resolve("app") == ["base", "lib1", "extra", "lib2"]
+    graph.add_edge("lib1", ["tool"])
+    graph.add_edge("tool", [])
+    assert graph.resolve("lib2") == ["base", "extra"]
+    closures = dict(graph._closures)
+
+    pkgs = list(graph.graph)
+    assert batch_query(graph, pkgs, batch_size=2, workers=2) == batch_query(graph, pkgs)
+    assert batch_query(graph, ["app"], batch_size=1, workers=2)["app"]["tool"] == 2
+    assert graph._closures == closures and graph._overrides
+
+
+def test_batch_query_async(graph):
+    assert asyncio.run(batch_query_async(graph, ["lib2"])) == {"lib2": {"base": 1, "extra": 1}}
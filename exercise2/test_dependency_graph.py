@@ -1,6 +1,9 @@
 import pytest
 import os
-from exercise2.dependency_graph import DependencyGraph, build_graph
+import json
+import io
+from exercise2.dependency_graph import DependencyGraph, build_graph, iter_manifest, manifest_diff, _JsonObjectReader
+from collections.abc import MutableMapping
 
 
 # Define a fixture to setup and teardown test json files
@@ -37,3 +40,277 @@ def test_build_graph(test_file):
 
     # Assert that the actual and expected graphs are the same
     assert actual.graph == expected.graph
+
+
+def test_compact_graph():
+    graph = DependencyGraph()
+    graph.add_edge("pkg1", ["pkg2", "pkg3", "pkg2"])
+    graph.add_edge("pkg2", ["pkg3"])
+    assert graph.graph["pkg1"] == ["pkg2", "pkg3"]  # Repeated edges are stored once
+
+    # Edges added after a read are merged with the stored ones
+    graph.add_edge("pkg1", ["pkg4", "pkg3"])
+    graph.add_edge("pkg3", [])
+    assert dict(graph.graph) == {"pkg1": ["pkg2", "pkg3", "pkg4"], "pkg2": ["pkg3"], "pkg3": []}
+    assert "pkg4" not in graph.graph and graph.dependencies("pkg4") == []  # Only a dependency, not declared
+
+    # Reverse index
+    assert graph.dependents("pkg3") == ["pkg1", "pkg2"]
+    assert graph.dependents("pkg1") == [] and graph.dependents("unknown") == []
+
+    # The view is read-only
+    assert not isinstance(graph.graph, MutableMapping)
+    with pytest.raises(TypeError):
+        graph.graph["pkg5"] = []
+
+
+def test_resolve(test_file, capsys):
+    filename, edges = test_file
+    graph = build_graph(filename)
+
+    # Every package comes after its dependencies, unless they are on the same cycle
+    order = {pkg: position for position, pkg in enumerate(graph.install_order())}
+    cycles = graph.cycles()
+    for pkg, deps in edges:
+        assert all(order[dep] < order[pkg] or any(pkg in cycle and dep in cycle for cycle in cycles) for dep in deps)
+        assert set(graph.resolve(pkg)) >= set(deps)
+
+    # Display terminates on cycles
+    for pkg in graph.graph:
+        graph.display_graph(pkg)
+    assert capsys.readouterr().out.count("(cycle)") == (3 if cycles else 0)
+
+
+def test_resolve_deep_chain():
+    graph = DependencyGraph()
+    size = 50000  # Deeper than the recursion limit
+    for i in range(size):
+        graph.add_edge(f"pkg{i}", [f"pkg{i + 1}", f"pkg{i + 2}"])
+    resolved = graph.resolve("pkg0")
+    assert len(resolved) == size + 1 and resolved[-1] == "pkg1"
+    assert graph.resolve(f"pkg{size - 2}") == [f"pkg{size}", f"pkg{size + 1}", f"pkg{size - 1}"]
+    assert graph.cycles() == [] and graph.resolve("unknown") == []
+
+
+# Every package of a long chain is resolved with the memoized closures of its dependencies:
+# the number of rows read stays linear in the size of the graph, in any order
+@pytest.mark.parametrize("order", ["leaves", "roots", "middle"])
+def test_resolve_all_chain(order):
+    graph = DependencyGraph()
+    size = 3000
+    for i in range(size):
+        graph.add_edge(f"pkg{i}", [f"pkg{i + 1}", f"pkg{i + 2}"])
+    pkgs = [f"pkg{i}" for i in range(size + 2)]
+    pkgs = {"leaves": pkgs[::-1], "roots": pkgs, "middle": pkgs[size // 2:] + pkgs[:size // 2]}[order]
+
+    reads = []
+    successors = graph._successors
+    graph._successors = lambda node: reads.append(node) or successors(node)
+    resolved = {pkg: graph.resolve(pkg) for pkg in pkgs}
+    assert len(reads) <= 2 * len(pkgs)
+    assert resolved["pkg0"][:3] == [f"pkg{size}", f"pkg{size + 1}", f"pkg{size - 1}"] and resolved["pkg0"][-1] == "pkg1"
+    assert resolved[f"pkg{size - 2}"] == [f"pkg{size}", f"pkg{size + 1}", f"pkg{size - 1}"]
+    assert all(len(resolved[f"pkg{i}"]) == size + 1 - i for i in range(size)) and resolved[f"pkg{size}"] == []
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_build_graph_streaming(test_file, tmp_path, use_mmap):
+    filename, expected_edges = test_file
+    expected = build_graph(filename)
+
+    stats = {}
+    assert build_graph(filename, streaming=True, use_mmap=use_mmap, stats=stats).graph == expected.graph
+    assert stats["packages"] == 3 and stats["edges"] == sum(len(deps) for _, deps in expected_edges)
+    assert stats["bytes_per_second"] > 0
+
+    # Newline-delimited JSON, one or more entries per line
+    ndjson = tmp_path / "deps.ndjson"
+    lines = [json.dumps(dict(expected_edges[:2])), "", json.dumps(dict(expected_edges[2:]))]
+    ndjson.write_text("\n".join(lines))
+    assert build_graph(ndjson, format="ndjson", use_mmap=use_mmap).graph == expected.graph
+
+
+def test_iter_manifest(tmp_path):
+    filename = tmp_path / "deps.json"
+    data = {f"pkg{i} é": [f"pkg{j}" for j in range(i % 4)] for i in range(100)}
+    filename.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    for chunk_size in (1, 7, 1 << 20):  # Tokens and UTF-8 characters split across chunks
+        assert dict(iter_manifest(filename, chunk_size=chunk_size)) == data
+
+    for content in ['{"pkg1": ["pkg2"', '{"pkg1" ["pkg2"]}', '["pkg1"]', '{"pkg1": "pkg2"}', '', '{"a": ["b"]} trailing', '{} {}']:
+        filename.write_text(content)
+        with pytest.raises(ValueError):
+            list(iter_manifest(filename))
+
+    # An error before the end of the buffer is raised without reading the rest of the file
+    chunks = iter(['{"pkg1": [pkg2], ', '"pkg3": []', '}'])
+    with pytest.raises(ValueError):
+        list(_JsonObjectReader(chunks))
+    assert next(chunks) == '"pkg3": []'
+
+    # A token split over many chunks is decoded again only a logarithmic number of times
+    content = json.dumps({"pkg": [f"dep{i}" for i in range(1000)]})
+    reader = _JsonObjectReader(iter(content))
+    raw_decode, calls = reader.decoder.raw_decode, []
+    reader.decoder.raw_decode = lambda *args: calls.append(args) or raw_decode(*args)
+    assert dict(reader) == json.loads(content) and len(calls) < 40
+
+
+# The streaming parser agrees with json.load: the last repeated key wins, and data after the object is an error
+def test_build_graph_streaming_json_load(tmp_path):
+    filename = tmp_path / "deps.json"
+    filename.write_text('{"a": ["b", "c"], "b": ["c"], "a": ["c", "d"], "c": []}\n')
+    for chunk_size in (1, 5):
+        assert list(iter_manifest(filename, chunk_size=chunk_size))[2] == ("a", ["c", "d"])
+    expected = build_graph(filename)
+    streamed = build_graph(filename, streaming=True)
+    assert dict(streamed.graph) == dict(expected.graph) == {"a": ["c", "d"], "b": ["c"], "c": []}
+    assert list(streamed.graph) == list(expected.graph) == ["a", "b", "c"]
+    assert streamed.dependents("b") == [] and streamed.install_order() == expected.install_order()
+
+    filename.write_text('{"a": ["b"]} trailing')
+    for streaming in (False, True):
+        with pytest.raises(ValueError, match="Extra data"):
+            build_graph(filename, streaming=streaming)
+
+
+def test_snapshot(test_file, tmp_path):
+    filename, _ = test_file
+    expected = build_graph(filename)
+
+    path = tmp_path / "deps.snapshot"
+    expected.add_edge("pkg é", ["pkg1"])
+    expected.save(path, source=filename)
+    loaded = DependencyGraph.load(path)
+    assert loaded.graph == expected.graph
+    assert loaded.install_order() == expected.install_order() and loaded.dependents("pkg1") == expected.dependents("pkg1")
+
+    # A loaded graph can still be modified
+    loaded.add_edge("pkg4", ["pkg1", "pkg5"])
+    assert loaded.graph["pkg4"] == ["pkg1", "pkg5"]
+    assert set(loaded.resolve("pkg4")) == {"pkg1", "pkg5"} | set(loaded.resolve("pkg1"))
+
+    # Changed rows and packages added after the arrays were built are saved, without clearing the cached closures
+    loaded.add_edge("solo", [])
+    assert loaded.resolve("pkg4")
+    closures = dict(loaded._closures)
+    loaded.save(tmp_path / "modified.snapshot")
+    assert loaded._closures == closures and loaded._overrides
+    assert DependencyGraph.load(tmp_path / "modified.snapshot").graph == loaded.graph
+
+    with pytest.raises(ValueError):
+        DependencyGraph.load(filename)
+
+
+def test_build_graph_snapshot(tmp_path):
+    filename = tmp_path / "deps.json"
+    filename.write_text('{"pkg1": ["pkg2"], "pkg2": []}')
+    stats = {}
+    assert dict(build_graph(filename, snapshot=True, stats=stats).graph) == {"pkg1": ["pkg2"], "pkg2": []}
+    assert not stats["snapshot"] and os.path.exists(f"{filename}.snapshot")
+    assert dict(build_graph(filename, snapshot=True, stats=stats).graph) == {"pkg1": ["pkg2"], "pkg2": []}
+    assert stats["snapshot"]
+
+    # A modified manifest makes the snapshot stale
+    filename.write_text('{"pkg1": ["pkg3"], "pkg3": ["pkg2"]}')
+    assert dict(build_graph(filename, snapshot=True, stats=stats).graph) == {"pkg1": ["pkg3"], "pkg3": ["pkg2"]}
+    assert not stats["snapshot"]
+
+    # Repeated edges are counted once, with and without the snapshot
+    filename.write_text('{"pkg1": ["pkg2", "pkg2", "pkg3"], "pkg3": ["pkg2"]}')
+    build_graph(filename, snapshot=True, stats=stats)
+    assert not stats["snapshot"] and stats["edges"] == 3
+    build_graph(filename, snapshot=True, stats=stats)
+    assert stats["snapshot"] and stats["edges"] == 3
+
+    # A snapshot that cannot be written does not fail the build
+    with pytest.warns(RuntimeWarning):
+        graph = build_graph(filename, snapshot=tmp_path / "missing" / "deps.snapshot")
+    assert graph.dependencies("pkg1") == ["pkg2", "pkg3"]
+
+
+def test_incremental_updates():
+    graph = DependencyGraph()
+    graph.add_edge("app", ["lib1", "lib2"])
+    graph.add_edge("lib1", ["base"])
+    graph.add_edge("lib2", [])
+    graph.add_edge("tool", ["lib2"])
+    assert graph.resolve("app") == ["base", "lib1", "lib2"] and graph.resolve("tool") == ["lib2"]
+    assert graph.resolve("lib1") == ["base"]
+
+    # Only the packages that depend on the changed one are resolved again
+    graph.add_edge("lib2", ["base", "extra"])
+    assert sorted(graph._names[node] for node in graph._closures) == ["base", "lib1"]
+    assert graph.resolve("tool") == ["base", "extra", "lib2"] and graph.resolve("app") == ["base", "lib1", "extra", "lib2"]
+    assert graph.dependents("base") == ["lib1", "lib2"]
+
+    graph.remove_edge("app", "lib1")
+    assert graph.resolve("app") == ["base", "extra", "lib2"] and graph.dependents("lib1") == []
+    graph.remove_package("lib2")
+    assert "lib2" not in graph.graph and graph.resolve("tool") == ["lib2"] and graph.dependents("extra") == []
+    # Removed packages leave the install order unless another package still depends on them, as do their dependencies
+    assert graph.install_order() == ["lib2", "app", "base", "lib1", "tool"]
+    graph.remove_package("tool")
+    graph.remove_package("app")
+    assert graph.install_order() == ["base", "lib1"] and graph.cycles() == []
+    graph.add_edge("app", ["lib2"])
+    graph.add_edge("tool", ["lib2"])
+    with pytest.raises(KeyError):
+        graph.remove_edge("app", "lib1")
+    with pytest.raises(KeyError):
+        graph.remove_package("lib2")
+
+    # A cycle added later
+    graph.add_edge("base", ["app"])
+    graph.add_edge("lib2", ["base"])
+    assert graph.cycles() == [["app", "lib2", "base"]] and graph.resolve("tool") == ["app", "lib2", "base"]
+
+
+def test_apply_diff(tmp_path):
+    old = {"pkg1": ["pkg2", "pkg3"], "pkg2": ["pkg3"], "pkg3": [], "pkg4": ["pkg1"]}
+    new = {"pkg1": ["pkg3", "pkg5"], "pkg2": ["pkg3"], "pkg3": [], "pkg5": ["pkg2"]}
+    diff = manifest_diff(old, new)
+    assert diff == {"added": {"pkg5": ["pkg2"]}, "removed": ["pkg4"], "changed": {"pkg1": {"added": ["pkg5"], "removed": ["pkg2"]}}}
+
+    filename = tmp_path / "deps.json"
+    filename.write_text(json.dumps(old))
+    graph = build_graph(filename)
+    assert graph.resolve("pkg1") == ["pkg3", "pkg2"]
+    graph.apply_diff(json.loads(json.dumps(diff)))
+    assert dict(graph.graph) == new
+    assert graph.resolve("pkg1") == ["pkg3", "pkg2", "pkg5"]
+    assert graph.install_order() == ["pkg3", "pkg2", "pkg5", "pkg1"]
+
+
+def test_render():
+    graph = DependencyGraph()
+    graph.add_edge("pkg1", ["pkg2", "pkg3"])
+    graph.add_edge("pkg2", ["pkg3"])
+    graph.add_edge("pkg3", ["pkg4"])
+
+    output = io.StringIO()
+    graph.render(file=output)
+    assert output.getvalue().splitlines()[:5] == ["- pkg1", "  - pkg2", "    - pkg3", "      - pkg4", "  - pkg3"]
+
+    output = io.StringIO()
+    graph.render(file=output, collapse=True)
+    assert output.getvalue().splitlines() == ["- pkg1", "  - pkg2", "    - pkg3", "      - pkg4", "  - pkg3 (repeated)",
+                                              "- pkg2 (repeated)", "- pkg3 (repeated)"]
+
+    output = io.StringIO()
+    graph.render(["pkg1"], file=output, max_depth=1)
+    assert output.getvalue().splitlines() == ["- pkg1", "  - pkg2 (truncated)", "  - pkg3 (truncated)"]
+
+    output = io.StringIO()
+    graph.render(["pkg2"], file=output, format="jsonl")
+    lines = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert lines[1] == {"package": "pkg3", "depth": 1, "parent": "pkg2", "marker": None}
+
+    output = io.StringIO()
+    graph.add_edge("pkg4", ["pkg1"])
+    graph.render(file=output, format="dot")
+    edges = [line.strip() for line in output.getvalue().splitlines() if "->" in line]
+    assert sorted(edges) == ['"pkg1" -> "pkg2";', '"pkg1" -> "pkg3";', '"pkg2" -> "pkg3";', '"pkg3" -> "pkg4";', '"pkg4" -> "pkg1";']
+
+    with pytest.raises(ValueError):
+        graph.render(format="yaml")